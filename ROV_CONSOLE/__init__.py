@@ -1,9 +1,13 @@
-from PySide6.QtWidgets import QApplication
 import sys
-from .gui import MainWindow
+
 
 def main():
+    # Imported here, not at package level: spawned decoder and control processes import this package too,
+    # and must not pay for PySide6, pygame and the rest of the GUI
+    from PySide6.QtWidgets import QApplication
+    from .gui import MainWindow
+
     app = QApplication(sys.argv)
     window = MainWindow()
     ret = app.exec()
-    sys.exit(ret)
\ No newline at end of file
+    sys.exit(ret)
@@ -0,0 +1,42 @@
+import os
+
+RASPBERRY_PI_IP = os.environ.get("ROV_PI_IP", "192.168.1.2")
+
+# Cameras shown left to right, comma separated specs (see video_sources.resolve_source):
+# device indices ("0"), ustreamer ports on the Pi ("pi:8081"), file paths or URLs, "none" for an empty tile
+CAMERA_SOURCES = os.environ.get("ROV_CAMERA_SOURCES", "0,1,2").split(",")
+
+# Decode every camera in its own worker process and share frames through shared memory,
+# spreads decoding over several cores instead of contending for the GIL with the GUI.
+# Enable with ROV_ISOLATED_DECODERS=1
+ISOLATED_DECODERS = os.environ.get("ROV_ISOLATED_DECODERS", "0") == "1"
+
+# Send the bare 9-byte control packet instead of COBS/CRC16 frames (protocol.py), for firmware
+# that doesn't speak the framed protocol yet. Telemetry is only received in framed form.
+LEGACY_CONTROL_PACKETS = os.environ.get("ROV_LEGACY_CONTROL_PACKETS", "0") == "1"
+
+# Memory cap (MB) and length (s) of each camera's rewind history, off (0 MB) unless asked for: every frame is
+# copied into it, e.g. 128 MB holds a few seconds of 1080p
+FRAME_HISTORY_MB = int(os.environ.get("ROV_FRAME_HISTORY_MB", "0"))
+FRAME_HISTORY_SECONDS = float(os.environ.get("ROV_FRAME_HISTORY_SECONDS", "10"))
+
+# Where CameraWidget recordings are written, one set of segments per camera
+RECORDINGS_DIR = os.environ.get("ROV_RECORDINGS_DIR", os.path.join(os.path.expanduser("~"), "ROV_recordings"))
+
+# Run the gamepad, packet encoding and serial link in a separate process (control_process.py), so GUI work
+# and garbage collection never delay a control packet. ROV_CONTROL_PRIORITY=1 additionally asks the OS for
+# real-time/ high priority for that process, silently ignored without the required privileges.
+CONTROL_PROCESS = os.environ.get("ROV_CONTROL_PROCESS", "0") == "1"
+CONTROL_PRIORITY = os.environ.get("ROV_CONTROL_PRIORITY", "0") == "1"
+
+# Control packets per second. The console has always sent one every 15 ms and the firmware expects that steady
+# stream, so this is the default; input changes go out immediately in between and restart the period
+CONTROL_RATE = float(os.environ.get("ROV_CONTROL_RATE", str(1000 / 15)))
+
+# Mix the stick input into per-thruster commands here (mixing.py) and send those instead of the raw axes,
+# needs firmware that accepts THRUSTERS frames, so it has no effect with LEGACY_CONTROL_PACKETS.
+# The allocation matrix can be replaced by a 6x5 CSV file (rows: thrusters, columns: surge, sway, pitch, yaw, heave).
+CLIENT_MIXING = os.environ.get("ROV_CLIENT_MIXING", "0") == "1"
+THRUSTER_ALLOCATION_FILE = os.environ.get("ROV_THRUSTER_ALLOCATION", "")
+# Stick response curve, 0 is linear and 1 cubic
+INPUT_EXPO = float(os.environ.get("ROV_INPUT_EXPO", "0.3"))
@@ -0,0 +1,327 @@
+"""
+    Optional isolation of the control path: gamepad input, packet encoding and the serial link (Controller,
+    ESP32, LinkMonitor) run in a dedicated child process, so GUI repaints, video decoding and the GUI's garbage
+    collector can never delay a thruster command.
+
+    The GUI talks to the child through two one-way pipes: commands go down as (target, name, args) tuples,
+    state snapshots come back at a fixed rate. The Remote* proxies mirror the parts of Controller, ESP32 and
+    LinkMonitor the GUI uses, reading from the latest snapshot so none of their properties ever block.
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any
+
+import serial.tools.list_ports
+
+from .constants import CONTROL_RATE
+from .esp32 import LinkState
+from .mixing import THRUSTERS
+
+# Raw state (bindings, telemetry) is pushed at this interval. Summaries (percentiles over the rolling windows)
+# and the gamepad list are computed less often, the GUI shows them at about 2 Hz
+_STATE_INTERVAL = 1 / 60
+_SLOW_STATE_INTERVAL = 0.5
+
+
+def _raise_priority() -> None:
+    """Best effort, silently keeps the default priority where the OS doesn't allow raising it"""
+    if sys.platform == "win32":
+        import ctypes
+        HIGH_PRIORITY_CLASS = 0x80
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), HIGH_PRIORITY_CLASS)
+        return
+    if hasattr(os, "sched_setscheduler"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(10))
+            return
+        except (PermissionError, OSError):
+            pass
+    try:
+        os.nice(-10)
+    except (PermissionError, OSError):
+        pass
+
+
+def _snapshot(controller, esp, link_monitor, slow: bool) -> dict[str, Any]:
+    """Latest values only, nothing is computed here: this runs next to the control threads"""
+    state = {
+        "bindings_state": controller.bindings_state,
+        "controller_connected": controller.connected,
+        "gamepad": controller.gamepad,
+        "thruster_commands": controller.thruster_commands,
+        "port": esp.port,
+        "esp_state": esp.state,
+        "esp_connected": esp.connected,
+        "reconnects": esp.reconnects,
+        "last_reset_time": esp.last_reset_time,
+        "telemetry_latest": esp.telemetry.latest,
+        }
+    if slow:
+        state.update(
+            scheduler_summary=controller.scheduler.summary(),
+            scheduler_rate=controller.scheduler.rate,
+            link_summary=link_monitor.summary(),
+            gamepads=controller.gamepads,
+            legacy=esp.legacy,
+            )
+    return state
+
+
+def _control_main(commands, states, raise_priority: bool) -> None:
+    from .esp32 import ESP32
+    from .gamepad import Controller
+    from .link_stats import LinkMonitor
+
+    if raise_priority:
+        _raise_priority()
+    controller = Controller()
+    esp = ESP32()
+    link_monitor = LinkMonitor(esp)
+    targets = {"controller": controller, "esp": esp, "link_monitor": link_monitor}
+    last_slow = 0.0
+    try:
+        while True:
+            if commands.poll(_STATE_INTERVAL):
+                command = commands.recv()
+                if command is None:
+                    break
+                target, name, args = command
+                try:
+                    if name == "payload_callback":
+                        # Callables can't cross the pipe, the only callback the GUI ever sets is ESP32.send
+                        controller.payload_callback = esp.send if args[0] else None
+                    elif name == "gamepad":
+                        controller.gamepad = args[0]
+                    else:
+                        getattr(targets[target], name)(*args)
+                except Exception:
+                    # A failing command must not take the control loop down with it
+                    traceback.print_exc()
+            now = time.monotonic()
+            slow = now - last_slow >= _SLOW_STATE_INTERVAL
+            if slow:
+                last_slow = now
+            states.send(_snapshot(controller, esp, link_monitor, slow))
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        link_monitor.kill()
+        controller.kill()
+        esp.kill()
+
+
+class ControlProcess:
+    """Starts the control child process and exposes proxies for it"""
+
+    def __init__(self, raise_priority: bool = False):
+        ctx = mp.get_context("spawn")
+        # Pipe(duplex=False) returns (read end, write end): the child reads commands and writes states
+        commands_in, self._commands = ctx.Pipe(duplex=False)
+        self._states, states_out = ctx.Pipe(duplex=False)
+        self._process = ctx.Process(target=_control_main, args=(commands_in, states_out, raise_priority), daemon=True)
+        self._process.start()
+        commands_in.close()
+        states_out.close()
+        self._lock = threading.Lock()
+        self.state: dict[str, Any] = {
+            "bindings_state": {},
+            "controller_connected": False,
+            "gamepad": None,
+            "gamepads": [],
+            "thruster_commands": (0.0,) * len(THRUSTERS),
+            "scheduler_summary": "--",
+            "scheduler_rate": CONTROL_RATE,
+            "port": None,
+            "esp_state": LinkState.DISCONNECTED,
+            "esp_connected": False,
+            "reconnects": 0,
+            "last_reset_time": None,
+            "legacy": False,
+            "telemetry_latest": None,
+            "link_summary": "RTT --",
+            }
+        self.controller = RemoteController(self)
+        self.esp = RemoteESP32(self)
+        self.link_monitor = RemoteLinkMonitor(self)
+        self._receiver_thread = threading.Thread(target=self._receiver_loop, daemon=True)
+        self._receiver_thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self._process.is_alive()
+
+    def call(self, target: str, name: str, *args) -> None:
+        with self._lock:
+            try:
+                self._commands.send((target, name, args))
+            except OSError as error:
+                print(f"Control process unreachable, {target}.{name} not sent: {error}", file=sys.stderr)
+
+    def _receiver_loop(self) -> None:
+        try:
+            while True:
+                self._apply(self._states.recv())
+        except (EOFError, OSError):
+            pass
+        self._process.join(timeout=2)
+        if self._process.exitcode != 0:
+            print(f"Control process exited with code {self._process.exitcode}", file=sys.stderr)
+        # Nothing is driving the thrusters anymore, the proxies must not keep reporting the last snapshot
+        self._apply({"controller_connected": False, "esp_state": LinkState.DISCONNECTED, "esp_connected": False})
+
+    def _apply(self, snapshot: dict[str, Any]) -> None:
+        old_state = self.state["esp_state"]
+        # Merged into a new dict, readers keep a consistent view of the previous one
+        self.state = {**self.state, **snapshot}
+        if self.state["esp_state"] != old_state:
+            self.esp.notify(old_state, self.state["esp_state"])
+
+    def kill(self) -> None:
+        with self._lock:
+            try:
+                self._commands.send(None)
+            except OSError:
+                # Already gone, the receiver thread reported how it exited
+                pass
+        self._process.join(timeout=2)
+        if self._process.is_alive():
+            self._process.terminate()
+
+
+class RemoteController:
+    def __init__(self, process: ControlProcess):
+        self._process = process
+        self.scheduler = _RemoteScheduler(process)
+
+    @property
+    def bindings_state(self):
+        return self._process.state["bindings_state"]
+
+    @property
+    def connected(self) -> bool:
+        return self._process.state["controller_connected"]
+
+    @property
+    def gamepads(self) -> list[str]:
+        return self._process.state["gamepads"]
+
+    @property
+    def thruster_commands(self) -> tuple[float, ...]:
+        return self._process.state["thruster_commands"]
+
+    @property
+    def gamepad(self) -> str | None:
+        return self._process.state["gamepad"]
+
+    @gamepad.setter
+    def gamepad(self, index: int | None) -> None:
+        self._process.call("controller", "gamepad", index)
+
+    @property
+    def payload_callback(self):
+        return None
+
+    @payload_callback.setter
+    def payload_callback(self, payload_callback) -> None:
+        self._process.call("controller", "payload_callback", payload_callback is not None)
+
+
+class _RemoteScheduler:
+    def __init__(self, process: ControlProcess):
+        self._process = process
+
+    @property
+    def rate(self) -> float:
+        return self._process.state["scheduler_rate"]
+
+    def summary(self) -> str:
+        return self._process.state["scheduler_summary"]
+
+
+class RemoteESP32:
+    def __init__(self, process: ControlProcess):
+        self._process = process
+        self.telemetry = _RemoteTelemetry(process)
+        self._subscribers = []
+
+    @property
+    def state(self) -> LinkState:
+        return self._process.state["esp_state"]
+
+    @property
+    def reconnects(self) -> int:
+        return self._process.state["reconnects"]
+
+    @property
+    def last_reset_time(self) -> float | None:
+        return self._process.state["last_reset_time"]
+
+    def subscribe(self, callback) -> None:
+        """Transitions are seen at the snapshot rate, called on the receiver thread"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def notify(self, old: LinkState, new: LinkState) -> None:
+        for callback in list(self._subscribers):
+            callback(old, new)
+
+    @property
+    def available_ports(self) -> list[str]:
+        """Enumerated in this process (by DeviceWatcher's thread), the control process never scans for ports"""
+        return [port.device for port in serial.tools.list_ports.comports()]
+
+    @property
+    def port(self) -> str | None:
+        return self._process.state["port"]
+
+    @property
+    def connected(self) -> bool:
+        return self._process.state["esp_connected"]
+
+    @property
+    def legacy(self) -> bool:
+        return self._process.state["legacy"]
+
+    def connect(self, port: str) -> None:
+        self._process.call("esp", "connect", port)
+
+    def disconnect(self) -> None:
+        self._process.call("esp", "disconnect")
+
+    def reset(self) -> None:
+        self._process.call("esp", "reset")
+
+    def send(self, buffer: bytes) -> None:
+        """Only used as the controller's payload callback marker, packets are produced in the child"""
+
+
+class _RemoteTelemetry:
+    def __init__(self, process: ControlProcess):
+        self._process = process
+
+    @property
+    def latest(self):
+        return self._process.state["telemetry_latest"]
+
+
+class RemoteLinkMonitor:
+    def __init__(self, process: ControlProcess):
+        self._process = process
+
+    def summary(self) -> str:
+        return self._process.state["link_summary"]
+
+    def reset(self) -> None:
+        self._process.call("link_monitor", "reset")
+
+    def export_csv(self, file_path: str) -> None:
+        self._process.call("link_monitor", "export_csv", file_path)
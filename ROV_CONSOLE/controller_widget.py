@@ -1,13 +1,29 @@
-from PySide6.QtWidgets import QWidget, QPushButton, QLabel
-from PySide6.QtCore import QTimer, QSize
-from PySide6.QtGui import QIcon
+from PySide6.QtWidgets import QWidget, QLabel
+from PySide6.QtCore import QTimer, QSize, QRect
+from PySide6.QtGui import QIcon, QPainter, QPixmap
 import os
 _ = os.path.dirname(os.path.abspath(__file__))
 ICONS_PATH = os.path.join(_, 'assets', 'ds4icons')
 DS4_ICONS = {f[:f.find('.')]:QIcon(os.path.join(ICONS_PATH, f)) for f in os.listdir(ICONS_PATH) if os.path.isfile(os.path.join(ICONS_PATH, f))}
+# Pixels the stick caps move at full deflection
+STICK_TRAVEL = 10
+
+# SVGs rasterized once per icon, size and pixel ratio, painting only blits them
+_PIXMAPS: dict[tuple[str, int, int, float], QPixmap] = {}
+
+
+def icon_pixmap(name: str, size: QSize, ratio: float) -> QPixmap:
+    key = (name, size.width(), size.height(), ratio)
+    pixmap = _PIXMAPS.get(key)
+    if pixmap is None:
+        pixmap = DS4_ICONS[name].pixmap(size, ratio)
+        _PIXMAPS[key] = pixmap
+    return pixmap
+
 
 class ControllerDisplay(QWidget):
-    def __init__(self, controller):
+    def __init__(self, controller, autopoll: bool = True):
+        """`autopoll`: run poll() from an own timer, off when the owner schedules it"""
         super().__init__()
 
         self.button_scheme = {
@@ -132,54 +148,72 @@ class ControllerDisplay(QWidget):
                 }
         }
 
-        self.buttons = {}
+        self.controller = controller
+        # Shown state per element: icon index and stick cap offset, compared against new input to find dirty regions
+        self._pressed = {b: 0 for b in self.button_scheme}
+        self._offsets = {'L3': (0, 0), 'R3': (0, 0)}
+        self._states = None
+        self._connected = False
+
+        bounds = QRect()
         for b in self.button_scheme:
-            button = QPushButton(self)
-            button.setObjectName(b)
-            button.setIcon(DS4_ICONS[self.button_scheme[b]['icons'][0]])
-            pos = self.button_scheme[b]['position']
-            button.move(pos[0], pos[1])
-            button.setIconSize(self.button_scheme[b]['size'])
-            button.setStyleSheet("border: none;")
-            self.buttons[b] = button
+            bounds = bounds.united(self._rect(b))
+        self.setMinimumSize(bounds.right() + STICK_TRAVEL + 1, bounds.bottom() + STICK_TRAVEL + 1)
 
         self.no_controller_label = QLabel('Please connect a controller.', self)
         self.no_controller_label.move(205,105)
-        self.no_controller_label.setVisible(False)
-
-        self.controller = controller
-        self.reset_flag = False
 
+        # Polls at the controller's packet rate, the display can't change faster than the input it shows
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update)
-        self.timer.start(50)
+        self.timer.timeout.connect(self.poll)
+        if autopoll:
+            self.timer.start(max(1, round(1000 / controller.scheduler.rate)))
 
-    def update(self):
-        if not self.controller.connected:
-            if not self.reset_flag:
-                self.reset_flag = True
-                for b in self.buttons:
-                    self.buttons[b].setIcon(DS4_ICONS[self.button_scheme[b]['icons'][0]])
-                    pos = self.button_scheme[b]['position']
-                    self.buttons[b].move(pos[0], pos[1])
-                    self.buttons[b].setVisible(False)
-                    self.no_controller_label.setVisible(True)
-            return
-
-        if self.reset_flag:
-            for b in self.buttons:
-                self.buttons[b].setVisible(True)
-                self.no_controller_label.setVisible(False)
+    def _rect(self, b: str) -> QRect:
+        x, y = self.button_scheme[b]['position']
+        dx, dy = self._offsets.get(b, (0, 0))
+        return QRect(x + dx, y + dy, self.button_scheme[b]['size'].width(), self.button_scheme[b]['size'].height())
 
-        self.reset_flag = False
+    def poll(self):
+        connected = self.controller.connected
+        if connected != self._connected:
+            self._connected = connected
+            self._states = None
+            self.no_controller_label.setVisible(not connected)
+            if not connected:
+                self._pressed = dict.fromkeys(self._pressed, 0)
+                self._offsets = dict.fromkeys(self._offsets, (0, 0))
+            self.update()
+        if not connected:
+            return
         states = self.controller.bindings_state
-        for b in states:
-            v = states[b]
-            if b in self.buttons:
-                self.buttons[b].setIcon(DS4_ICONS[self.button_scheme[b]['icons'][v != 0]])
-        ls_x = states['LS-H'] * 10 + int(self.button_scheme['L3']['position'][0])
-        ls_y = states['LS-V'] * 10 + int(self.button_scheme['L3']['position'][1])
-        rs_x = states['RS-H'] * 10 + int(self.button_scheme['R3']['position'][0])
-        rs_y = states['RS-V'] * 10 + int(self.button_scheme['R3']['position'][1])
-        self.buttons['L3'].move(ls_x, ls_y)
-        self.buttons['R3'].move(rs_x, rs_y)
\ No newline at end of file
+        # Published as a new dict on every change, the same object means nothing to redraw
+        if states is self._states or not states:
+            return
+        self._states = states
+        dirty = QRect()
+        for b in self.button_scheme:
+            pressed = int(states.get(b, 0) != 0)
+            if pressed != self._pressed[b]:
+                self._pressed[b] = pressed
+                dirty = dirty.united(self._rect(b))
+        for b, (h, v) in (('L3', ('LS-H', 'LS-V')), ('R3', ('RS-H', 'RS-V'))):
+            offset = (round(states.get(h, 0) * STICK_TRAVEL), round(states.get(v, 0) * STICK_TRAVEL))
+            if offset != self._offsets[b]:
+                dirty = dirty.united(self._rect(b))
+                self._offsets[b] = offset
+                dirty = dirty.united(self._rect(b))
+        if not dirty.isNull():
+            self.update(dirty)
+
+    def paintEvent(self, event):
+        if not self._connected:
+            return
+        painter = QPainter(self)
+        ratio = self.devicePixelRatioF()
+        region = event.rect()
+        # Scheme order is paint order, later elements (stick caps) are drawn on top
+        for b, scheme in self.button_scheme.items():
+            rect = self._rect(b)
+            if rect.intersects(region):
+                painter.drawPixmap(rect.topLeft(), icon_pixmap(scheme['icons'][self._pressed[b]], scheme['size'], ratio))
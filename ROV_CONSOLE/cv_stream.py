@@ -1,52 +1,397 @@
 """
     Fault-tolerant video stream handler using opencv.
+    Frames are published as they arrive, each tagged with a sequence number and a capture timestamp.
+    Scaling, mirroring and BGR->RGB conversion for display happen on the capture thread into reused buffers,
+    so the GUI thread only has to blit a ready image.
+    Sources are opened on the capture thread and reopened with exponential backoff when they drop.
+    An optional frame history allows pausing and scrubbing back while capture (and the history) carries on.
 """
 
 import cv2
-from threading import Thread
-from time import sleep
+import numpy as np
+from collections.abc import Callable
+from threading import Thread, Condition, Event, Lock
+from time import perf_counter
+
+from .constants import ISOLATED_DECODERS, FRAME_HISTORY_MB, FRAME_HISTORY_SECONDS
+from .frame_history import FrameHistory
+from .recorder import SegmentRecorder
+from .shm_capture import SharedMemoryCapture
+from .video_sources import open_capture, timed_read
+from .video_stats import VideoStats
 
 from os import path
 NO_VIDEO_INDICATOR = path.join(path.dirname(path.abspath(__file__)), 'assets', 'novideo.jpeg')
 
+# Back-off used when the source is closed or a read fails, so a dead source doesn't spin the thread
+_IDLE_INTERVAL = 0.1
+# An open source that hasn't delivered a frame for this long is considered dropped
+_STALE_TIMEOUT = 3.0
+# Reconnect delays double from min to max, reset once a frame comes through
+_RECONNECT_MIN = 0.25
+_RECONNECT_MAX = 8.0
+# Playback rate of recordings started before the capture rate could be measured
+_DEFAULT_FPS = 30.0
+# Display buffers are rotated so the one the GUI is reading is never the one being written
+_DISPLAY_BUFFERS = 3
+
+
 class VideoStream:
-    def __init__(self, descriptor: int | str | None):
-        self._source = cv2.VideoCapture()
-        if descriptor is not None:
-            self._source.open(descriptor)
+    def __init__(
+            self,
+            descriptor: int | str | None,
+            on_frame: Callable[[int], None] | None = None,
+            isolated: bool = ISOLATED_DECODERS,
+            history_mb: int = FRAME_HISTORY_MB,
+            history_seconds: float = FRAME_HISTORY_SECONDS,
+            ):
+        self._descriptor = descriptor
+        self._isolated = isolated
+        # Opened by the capture thread, so a slow source never blocks the caller
+        self._source = None
+        self._reconnects = 0
         self._no_frame = cv2.imread(NO_VIDEO_INDICATOR)
         self._frame = self._no_frame
+        self._seq = 0
+        self._timestamp = perf_counter()
+        self._published_at = self._timestamp
+        self._stats = VideoStats()
+        self._recorder: SegmentRecorder | None = None
+        self._history = FrameHistory(history_mb * 1024 * 1024, history_seconds) if history_mb > 0 else None
+        self._paused = False
+        # Held by the capture thread while pushing, so the frame taken as the moment of pausing is the newest one
+        self._history_lock = Lock()
+        # History indices (see FrameHistory) of the moment of pausing and of the frame shown while paused
+        self._paused_index = 0
+        self._shown_index = 0
+        self._new_frame = Condition()
+        self._on_frame = on_frame
+        self._display_size: tuple[int, int] | None = None
+        self._h_mirror = False
+        self._v_mirror = False
+        self._settings_changed = Event()
+        self._scaled: np.ndarray | None = None
+        self._display_buffers: list[np.ndarray] = []
+        self._display_index = 0
+        self._display_frame = self._render(self._no_frame)
         self._killswitch = False
         self._frame_thread = Thread(target=self._frame_loop, daemon=True)
         self._frame_thread.start()
 
     @property
     def frame(self):
+        """Latest frame as delivered by the source (BGR, source resolution)"""
         return self._frame
 
+    @property
+    def display_frame(self) -> np.ndarray:
+        """Latest frame scaled to the display size, mirrored and converted to RGB"""
+        return self._display_frame
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the current frame, incremented on every new frame"""
+        return self._seq
+
+    @property
+    def timestamp(self) -> float:
+        """perf_counter() time at which the current frame arrived from the source, before decoding"""
+        return self._timestamp
+
+    @property
+    def descriptor(self) -> int | str | None:
+        return self._descriptor
+
+    @property
+    def connected(self) -> bool:
+        source = self._source
+        return source is not None and source.isOpened()
+
+    @property
+    def reconnects(self) -> int:
+        """Number of times the source was dropped or failed to open and had to be reopened"""
+        return self._reconnects
+
+    @property
+    def published_at(self) -> float:
+        """perf_counter() time at which the current frame was ready for display"""
+        return self._published_at
+
+    @property
+    def stats(self) -> VideoStats:
+        return self._stats
+
+    @property
+    def recorder(self) -> SegmentRecorder | None:
+        return self._recorder
+
+    @property
+    def recording(self) -> bool:
+        return self._recorder is not None and self._recorder.running
+
+    def start_recording(self, directory: str, name: str, **kwargs) -> SegmentRecorder:
+        """
+        Starts recording captured frames in the background, see SegmentRecorder for `kwargs`.
+        Segments play back at the measured capture rate unless `fps` is given
+        """
+        self.stop_recording()
+        if "fps" not in kwargs:
+            kwargs["fps"] = self._capture_fps()
+        self._recorder = SegmentRecorder(directory, name, **kwargs)
+        return self._recorder
+
+    def stop_recording(self) -> None:
+        """Returns right away, the recorder finishes encoding its backlog in the background"""
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.stop()
+
+    def _capture_fps(self) -> float:
+        rate = self._stats.capture_rate.rate
+        if rate > 0:
+            return rate
+        source = self._source
+        if hasattr(source, "get"):
+            rate = source.get(cv2.CAP_PROP_FPS)
+        return rate if rate > 0 else _DEFAULT_FPS
+
+    @property
+    def history(self) -> FrameHistory | None:
+        return self._history
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @property
+    def history_position(self) -> int:
+        """Frames the shown frame is before the moment of pausing, negative after it"""
+        return self._paused_index - self._shown_index
+
+    def history_range(self) -> tuple[int, int]:
+        """How many frames the history reaches back before the moment of pausing and forward after it"""
+        history = self._history
+        if history is None or not self._paused:
+            return 0, 0
+        return max(0, self._paused_index - history.oldest), max(0, history.newest - self._paused_index)
+
+    def pause(self) -> bool:
+        """Freezes the display on the newest frame, capture and the history keep running"""
+        if self._history is None:
+            return False
+        with self._history_lock:
+            if not len(self._history):
+                return False
+            self._paused_index = self._shown_index = self._history.newest
+            self._paused = True
+        self._settings_changed.set()
+        return True
+
+    def resume(self) -> None:
+        with self._history_lock:
+            self._paused = False
+        self._settings_changed.set()
+
+    def seek(self, back: int) -> None:
+        """Shows the frame `back` frames before the moment of pausing (negative: after it) while paused"""
+        if not self._paused:
+            return
+        self._shown_index = self._clamp_index(self._paused_index - back)
+        self._settings_changed.set()
+
+    def step(self, frames: int) -> None:
+        """Moves the paused position `frames` forward in time (negative goes back)"""
+        self.seek(self.history_position - frames)
+
+    def _clamp_index(self, index: int) -> int:
+        return max(self._history.oldest, min(index, self._history.newest))
+
+    @property
+    def on_frame(self) -> Callable[[int], None] | None:
+        return self._on_frame
+
+    @on_frame.setter
+    def on_frame(self, on_frame: Callable[[int], None] | None) -> None:
+        self._on_frame = on_frame
+
+    @property
+    def display_size(self) -> tuple[int, int] | None:
+        """(width, height) display frames are scaled to, None keeps the source resolution"""
+        return self._display_size
+
+    @display_size.setter
+    def display_size(self, size: tuple[int, int] | None) -> None:
+        if size is not None and (size[0] <= 0 or size[1] <= 0):
+            return
+        if size != self._display_size:
+            self._display_size = size
+            self._apply_target_size()
+            self._settings_changed.set()
+
+    def set_mirror(self, horizontally: bool, vertically: bool) -> None:
+        if (horizontally, vertically) != (self._h_mirror, self._v_mirror):
+            self._h_mirror = horizontally
+            self._v_mirror = vertically
+            self._settings_changed.set()
+
+    @staticmethod
+    def _open_source(descriptor: int | str | None, isolated: bool):
+        """Returns a cv2.VideoCapture-like source, decoding in a worker process when `isolated`"""
+        if isolated:
+            return SharedMemoryCapture(descriptor)
+        return open_capture(descriptor)
+
+    def _apply_target_size(self) -> None:
+        source = self._source
+        if hasattr(source, "target_size"):
+            # Lets sources that can decode at reduced scale skip pixels the display would throw away
+            source.target_size = self._display_size
+
+    def _release_source(self) -> None:
+        source, self._source = self._source, None
+        if source is not None:
+            # The current frame may be a view into the source's memory, drop it before releasing
+            if self._frame is not self._no_frame and not self._paused:
+                self._publish(self._no_frame, perf_counter())
+            source.release()
+
+    def wait_frame(self, after_seq: int, timeout: float | None = None) -> bool:
+        """Blocks until a frame newer than `after_seq` is available, returns False on timeout"""
+        with self._new_frame:
+            return self._new_frame.wait_for(lambda: self._seq > after_seq or self._killswitch, timeout)
+
+    def _allocate_display_buffers(self, width: int, height: int) -> None:
+        self._scaled = np.empty((height, width, 3), dtype=np.uint8)
+        self._display_buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(_DISPLAY_BUFFERS)]
+        self._display_index = 0
+
+    def _render(self, frame: np.ndarray) -> np.ndarray:
+        """Scales, mirrors and converts `frame` into the next free display buffer"""
+        src_height, src_width = frame.shape[:2]
+        width, height = self._display_size or (src_width, src_height)
+        if not self._display_buffers or self._display_buffers[0].shape[:2] != (height, width):
+            self._allocate_display_buffers(width, height)
+        self._display_index = (self._display_index + 1) % _DISPLAY_BUFFERS
+        out = self._display_buffers[self._display_index]
+        if (src_width, src_height) != (width, height):
+            shrinking = width < src_width or height < src_height
+            cv2.resize(frame, (width, height), dst=self._scaled,
+                       interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+            frame = self._scaled
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+        if self._h_mirror or self._v_mirror:
+            # flipCode: 1 horizontal, 0 vertical, -1 both
+            flip_code = -1 if self._h_mirror and self._v_mirror else int(self._h_mirror)
+            cv2.flip(out, flip_code, dst=out)
+        return out
+
+    def _publish(self, frame, timestamp: float) -> None:
+        self._settings_changed.clear()
+        render_start = perf_counter()
+        display_frame = self._render(frame)
+        published_at = perf_counter()
+        self._stats.record("convert", published_at - render_start)
+        with self._new_frame:
+            self._frame = frame
+            self._display_frame = display_frame
+            self._timestamp = timestamp
+            self._published_at = published_at
+            self._seq += 1
+            self._new_frame.notify_all()
+        if self._on_frame is not None:
+            self._on_frame(self._seq)
+
+    def _republish(self) -> None:
+        """Re-renders the shown frame after a settings change, or the selected history frame while paused"""
+        if self._paused:
+            self._shown_index = self._clamp_index(self._shown_index)
+            frame, timestamp = self._history.frame(self._shown_index)
+            self._publish(frame, timestamp)
+        else:
+            self._publish(self._frame, self._timestamp)
+
+    def _idle(self, duration: float) -> None:
+        """Sleeps for `duration`, re-rendering the still frame whenever the display settings change"""
+        deadline = perf_counter() + duration
+        while not self._killswitch:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                return
+            if self._settings_changed.wait(remaining) and not self._killswitch:
+                self._republish()
+
     def _frame_loop(self):
+        backoff = _RECONNECT_MIN
+        last_frame = perf_counter()
         try:
             while not self._killswitch:
+                if self._source is None:
+                    if self._descriptor is None:
+                        self._idle(_IDLE_INTERVAL)
+                        continue
+                    # Blocks this stream's thread only, every camera opens in parallel
+                    self._source = self._open_source(self._descriptor, self._isolated)
+                    self._apply_target_size()
+                    last_frame = perf_counter()
                 if self._source.isOpened():
-                    _, f = self._source.read()
+                    # read() blocks until the source delivers (files are paced by PacedCapture), no need to poll
+                    read_start = perf_counter()
+                    _, f, captured, decode = timed_read(self._source)
                     if _:
-                        self._frame = f
-                else:
-                    self._frame = self._no_frame
-                sleep(0.015)
+                        last_frame = perf_counter()
+                        backoff = _RECONNECT_MIN
+                        # A frame that arrived while the previous one was processed wasn't waited for
+                        self._stats.record("wait", max(0.0, captured - read_start))
+                        self._stats.record("decode", decode)
+                        self._stats.capture_rate.tick(captured)
+                        recorder = self._recorder
+                        if recorder is not None:
+                            # Shared memory frames are views into a slot the decoder reuses
+                            recorder.submit(f, captured, copy=isinstance(self._source, SharedMemoryCapture))
+                        if self._history is not None:
+                            with self._history_lock:
+                                self._history.push(f, captured)
+                        if self._paused:
+                            # Only the display is paused; once the shown frame was overwritten (or the history
+                            # restarted at a new resolution) the nearest one still available is shown instead
+                            available = self._history.oldest <= self._shown_index <= self._history.newest
+                            if self._settings_changed.is_set() or not available:
+                                self._republish()
+                            continue
+                        self._publish(f, captured)
+                        continue
+                    if perf_counter() - last_frame < _STALE_TIMEOUT:
+                        self._idle(_IDLE_INTERVAL)
+                        continue
+                # Source closed or stale: show the indicator and reopen after backing off
+                self._release_source()
+                self._reconnects += 1
+                self._idle(backoff)
+                backoff = min(backoff * 2, _RECONNECT_MAX)
         except SystemExit:
             self.kill()
 
+    def _wake_waiters(self):
+        self._settings_changed.set()
+        with self._new_frame:
+            self._new_frame.notify_all()
+
     def kill(self):
         self._killswitch = True
+        self.stop_recording()
+        if self._recorder is not None:
+            # Shutting down, a segment closed before its backlog is written would be cut short
+            self._recorder.wait()
+        self._wake_waiters()
         if self._frame_thread.is_alive():
             self._frame_thread.join()
-        if self._source.isOpened():
-            self._source.release()
+        self._frame = self._no_frame
+        self._release_source()
 
     def __del__(self):
         self._killswitch = True
+        self._settings_changed.set()
         if self._frame_thread.is_alive():
             self._frame_thread.join()
-        if self._source.isOpened():
-            self._source.release()
\ No newline at end of file
+        self._frame = self._no_frame
+        self._release_source()
@@ -0,0 +1,80 @@
+"""
+    Watches for serial ports and gamepads coming and going on a background thread.
+    Enumeration (comports(), joystick lists) never runs on the GUI thread, the GUI reads the cached lists
+    and rebuilds its menus only when `changed` is emitted.
+"""
+
+from threading import Event, Thread
+
+from PySide6.QtCore import QObject, Signal
+
+
+class DeviceWatcher(QObject):
+    # Emitted from the watcher thread, queued to the receiver's thread by Qt
+    changed = Signal()
+
+    _ports: list[str]
+    _gamepads: list[str]
+    _connected: bool
+    _killswitch: bool
+    _watch_thread: Thread
+
+    def __init__(self, esp, controller, interval: float = 1.0):
+        super().__init__()
+        self._esp = esp
+        self._controller = controller
+        self._interval = interval
+        self._ports = []
+        self._gamepads = []
+        self._connected = False
+        self._snapshot = None
+        self._wake = Event()
+        self._killswitch = False
+        # Connection changes show up in the menus right away instead of at the next interval
+        esp.subscribe(self._on_link_state)
+        self._watch_thread = Thread(target=self._watch_loop, daemon=True)
+        self._watch_thread.start()
+
+    @property
+    def ports(self) -> list[str]:
+        return self._ports
+
+    @property
+    def gamepads(self) -> list[str]:
+        return self._gamepads
+
+    @property
+    def connected(self) -> bool:
+        """ESP32 connection as of the last check"""
+        return self._connected
+
+    def refresh(self) -> None:
+        """Checks right away instead of at the next interval, e.g. after the user picked a device"""
+        self._wake.set()
+
+    def _on_link_state(self, old, new) -> None:
+        self.refresh()
+
+    def _watch_loop(self) -> None:
+        while not self._killswitch:
+            ports = list(self._esp.available_ports)
+            gamepads = list(self._controller.gamepads)
+            connected = self._esp.connected
+            snapshot = (ports, gamepads, connected, self._esp.port, self._controller.gamepad)
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                self._ports, self._gamepads, self._connected = ports, gamepads, connected
+                self.changed.emit()
+            self._wake.wait(self._interval)
+            self._wake.clear()
+
+    def kill(self) -> None:
+        self._esp.unsubscribe(self._on_link_state)
+        self._killswitch = True
+        self._wake.set()
+        if self._watch_thread.is_alive():
+            self._watch_thread.join()
+
+    def __del__(self) -> None:
+        self._killswitch = True
+        self._wake.set()
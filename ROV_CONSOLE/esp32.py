@@ -1,20 +1,132 @@
-import subprocess
 import threading
+from collections.abc import Callable
+from enum import StrEnum
 import serial
 import serial.tools.list_ports
-from sys import stderr
+from time import perf_counter, sleep
+
+from .constants import LEGACY_CONTROL_PACKETS
+from .protocol import MessageType, Frame, FrameEncoder, FrameDecoder, legacy_control_packet
+from .stats import RollingStats
+from .telemetry import Telemetry
+
+
+class LinkState(StrEnum):
+    DISCONNECTED = "disconnected"  # No port selected
+    CONNECTED = "connected"
+    DEGRADED = "degraded"          # Port open but the ESP32 went quiet
+    RECONNECTING = "reconnecting"  # Port failed, reopening with backoff
+    RESETTING = "resetting"
+    LOST = "lost"                  # Reconnecting for too long, still retried at the longest backoff
 
-ESP_TOOL = ["python", "-m", "esptool"]
 
 class ESP32:
     _BAUDRATE: int = 115200
+    # A stalled port fails the write instead of blocking the transmit thread indefinitely
+    _WRITE_TIMEOUT: float = 0.5
+    # Bounds how long the reader blocks in read(), also how quickly it notices a port change
+    _READ_TIMEOUT: float = 0.05
+    # Health checks of the supervisor thread, all in seconds
+    _SUPERVISE_INTERVAL: float = 0.1
+    _DEGRADED_SILENCE: float = 1.0
+    # Network ports (RFC2217) don't fail on a dead peer, silence this long counts as a disconnect
+    _URL_LOST_SILENCE: float = 3.0
+    _RECONNECT_MIN: float = 0.25
+    _RECONNECT_MAX: float = 8.0
+    _LOST_AFTER: float = 10.0
+    # How long EN is held low on reset
+    _RESET_PULSE: float = 0.1
     _serial:   serial.Serial
+    _port_name: str | None
     _port_rfc: bool
+    _state: LinkState
+    _subscribers: list[Callable[[LinkState, LinkState], None]]
+    _tx_packets: dict[int, bytes]
+    _tx_thread: threading.Thread
+    _rx_thread: threading.Thread
+    _supervisor_thread: threading.Thread
+    _telemetry: Telemetry
+    _frame_handlers: dict[int, Callable[[Frame], None]]
 
-    def __init__(self):
-        self._serial = serial.Serial(port=None, baudrate=self._BAUDRATE)
-        self._resetting = False
+    def __init__(self, legacy_control_packets: bool = LEGACY_CONTROL_PACKETS):
+        self._serial = self._open_serial(None)
+        self._port_name = None
         self._port_rfc = False
+        # Bumped whenever the port is selected or deselected, a port opened for an older selection is discarded
+        self._port_generation = 0
+        self._killswitch = False
+        # Connection state, only changed through _set_state(); the port itself is swapped under _port_lock
+        self._port_lock = threading.RLock()
+        self._state = LinkState.DISCONNECTED
+        self._state_since = perf_counter()
+        self._subscribers = []
+        self._port_error = False
+        self._last_rx: float | None = None
+        self._down_since = 0.0
+        self._backoff = self._RECONNECT_MIN
+        self._next_attempt = 0.0
+        self._reconnects = 0
+        self._reconnect_time = RollingStats(100)
+        self._reset_started: float | None = None
+        self._reset_time = RollingStats(100)
+        self._last_reset_time: float | None = None
+        self._supervisor_wake = threading.Event()
+        # Firmware that predates the framed protocol only understands the bare 9-byte control packet
+        self._legacy = legacy_control_packets
+        self._encoder = FrameEncoder()
+        self._decoder = FrameDecoder()
+        # Mailbox with one slot per message type: send() overwrites whatever the transmit thread hasn't picked up yet
+        self._tx_packets = {}
+        self._tx_ready = threading.Condition()
+        self._sent = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._write_latency = RollingStats()
+        self._tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        self._tx_thread.start()
+        self._telemetry = Telemetry()
+        self._frame_handlers = {
+            MessageType.TELEMETRY: self._telemetry.on_frame,
+            MessageType.PING: self._on_ping,
+            MessageType.LOG: self._on_log,
+            }
+        self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
+        self._rx_thread.start()
+        self._supervisor_thread = threading.Thread(target=self._supervise_loop, daemon=True)
+        self._supervisor_thread.start()
+
+    def _open_serial(self, port: str | None, url: bool = False) -> serial.Serial:
+        kwargs = dict(baudrate=self._BAUDRATE, timeout=self._READ_TIMEOUT, write_timeout=self._WRITE_TIMEOUT)
+        if url:
+            return serial.serial_for_url(port, **kwargs)
+        return serial.Serial(port=port, **kwargs)
+
+    @property
+    def telemetry(self) -> Telemetry:
+        return self._telemetry
+
+    @property
+    def legacy(self) -> bool:
+        """True when sending bare 9-byte control packets, only CONTROL payloads go out then"""
+        return self._legacy
+
+    @property
+    def decoder(self) -> FrameDecoder:
+        """Receive side framing, holds received/ lost/ error counts"""
+        return self._decoder
+
+    def set_frame_handler(self, kind: MessageType, handler: Callable[[Frame], None] | None) -> None:
+        """Registers `handler` for incoming frames of `kind`, called on the reader thread"""
+        if handler is None:
+            self._frame_handlers.pop(kind, None)
+        else:
+            self._frame_handlers[kind] = handler
+
+    def _on_ping(self, frame: Frame) -> None:
+        self.send(frame.payload, MessageType.PONG)
+
+    def _on_log(self, frame: Frame) -> None:
+        print(frame.payload.decode(errors="replace"), end="" if frame.payload.endswith(b"\n") else "\n")
 
     @property
     def available_ports(self):
@@ -22,70 +134,326 @@ class ESP32:
 
     @property
     def port(self) -> str | None:
-        return self._serial.port
+        """Selected port, kept while the connection is being recovered"""
+        return self._port_name
+
+    @property
+    def state(self) -> LinkState:
+        return self._state
+
+    @property
+    def state_since(self) -> float:
+        """perf_counter() of the last state transition"""
+        return self._state_since
 
     @property
-    def resetting(self):
-        return self._resetting
+    def resetting(self) -> bool:
+        return self._state == LinkState.RESETTING
 
     @property
     def connected(self) -> bool:
-        if self._resetting:
-            return False
-        try:
-            # Works with actual serial ports, network ports may need a write/ read operation instead to raise exception
-            _ = self._serial.in_waiting
-        except serial.SerialException:
-            self._serial.close()
-            if self._serial.port in self.available_ports:
-                # Try to revive connection
-                self._serial.open()
-            else:
-                # Forget connection
-                self._serial.port = None
-        return self._serial.port is not None
+        return self._state in (LinkState.CONNECTED, LinkState.DEGRADED)
+
+    @property
+    def reconnects(self) -> int:
+        return self._reconnects
+
+    @property
+    def reconnect_time(self) -> RollingStats:
+        """Seconds from losing the port to having it open again, per recovery"""
+        return self._reconnect_time
+
+    @property
+    def reset_time(self) -> RollingStats:
+        """Seconds from the start of each reset to the first telemetry frame after it"""
+        return self._reset_time
+
+    @property
+    def last_reset_time(self) -> float | None:
+        return self._last_reset_time
+
+    def subscribe(self, callback: Callable[[LinkState, LinkState], None]) -> None:
+        """`callback(old, new)` is called on every transition, on the thread that caused it: keep it short"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[LinkState, LinkState], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _set_state(self, state: LinkState) -> None:
+        if state == self._state:
+            return
+        old, self._state = self._state, state
+        self._state_since = perf_counter()
+        for callback in list(self._subscribers):
+            callback(old, state)
 
     def reset(self):
-        def actual_reset():
-            subprocess.run(ESP_TOOL + ["--port", self.port, "reset"])
-            self._resetting = False
+        """
+        Pulses EN through the USB-serial bridge's RTS line, the same wiring esptool uses, on the port that
+        is already open. Returns immediately, the port stays open and is used again once EN is released
+        """
+        with self._port_lock:
+            if not self.connected:
+                return
+            self._reset_started = perf_counter()
+            try:
+                self._serial.dtr = False  # IO0 high: boot the firmware, not the ROM loader
+                self._serial.rts = True   # EN low: hold the chip in reset
+            except (serial.SerialException, OSError, ValueError):
+                self._reset_started = None
+                self._port_failed()
+                return
+            self._set_state(LinkState.RESETTING)
+        threading.Timer(self._RESET_PULSE, self._release_reset).start()
 
-        self._resetting = True
-        reset_thread = threading.Thread(target=actual_reset)
-        reset_thread.start()
+    def _release_reset(self) -> None:
+        with self._port_lock:
+            if self._state != LinkState.RESETTING:
+                return
+            self._last_rx = None
+            try:
+                self._serial.rts = False
+            except (serial.SerialException, OSError, ValueError):
+                # Native USB chips re-enumerate on reset, the supervisor re-attaches once the port is back
+                self._port_failed()
+            self._set_state(LinkState.CONNECTED)
+        self._supervisor_wake.set()
 
     def disconnect(self):
-        self._serial.close()
-        self._serial.port = None
+        with self._port_lock:
+            self._serial.close()
+            self._port_name = None
+            self._port_generation += 1
+            self._set_state(LinkState.DISCONNECTED)
 
     def connect(self, port: str) -> None:
-        self._serial.close()
-        if 'rfc2217://' in port and not self._port_rfc:
-            print('Ports over RFC is not fully supported, disconnects will not be detected!', stderr)
-            self._serial = serial.serial_for_url(port, baudrate=self._BAUDRATE)
-            self._port_rfc = True
-            return
-        if 'rfc2217://' not in port and self._port_rfc:
-            self._serial = serial.Serial(port=port, baudrate=self._BAUDRATE)
-            self._port_rfc = False
-            return
+        with self._port_lock:
+            self._serial.close()
+            # RFC2217 and other pySerial URL handlers, disconnects on those are detected by silence
+            url = self._port_rfc = "://" in port
+            self._port_name = port
+            self._port_generation += 1
+            generation = self._port_generation
+            # Keeps the supervisor from reopening the previous port meanwhile
+            self._set_state(LinkState.DISCONNECTED)
+        # Opening a URL can take seconds, the lock stays free for the supervisor and other callers
+        serial_port = self._open_port(port, url)
+        with self._port_lock:
+            if generation != self._port_generation:
+                # Another port was selected (or none) while this one was opening
+                if serial_port is not None:
+                    serial_port.close()
+                return
+            if serial_port is not None:
+                self._attach(serial_port)
+                self._set_state(LinkState.CONNECTED)
+            else:
+                self._port_name = None
+                self._set_state(LinkState.DISCONNECTED)
+
+    def _open_port(self, port: str, url: bool) -> serial.Serial | None:
+        """Opens `port` without touching the current one, call without holding _port_lock"""
         try:
-            self._serial.port = port
-            self._serial.open()
-        except serial.SerialException:
-            self._serial.port = None
+            return self._open_serial(port, url=url)
+        except (serial.SerialException, ValueError, OSError):
+            return None
 
-    def send(self, buffer: bytes) -> None:
-        if self.connected:
-            self._serial.write(buffer)
+    def _attach(self, serial_port: serial.Serial) -> None:
+        """Makes `serial_port` the current port, call with _port_lock held"""
+        self._serial = serial_port
+        self._port_error = False
+        self._last_rx = None
+
+    def _begin_recovery(self, state: LinkState = LinkState.RECONNECTING) -> None:
+        self._down_since = perf_counter()
+        self._backoff = self._RECONNECT_MIN
+        self._next_attempt = self._down_since
+        self._set_state(state)
+
+    def _healthy(self) -> bool:
+        if self._port_error:
+            return False
+        if self._port_rfc:
+            return True
+        try:
+            # Fails on real serial ports once the device is gone
+            _ = self._serial.in_waiting
+        except (serial.SerialException, OSError):
+            return False
+        return True
+
+    def _supervise_loop(self) -> None:
+        # Recovery runs here, never on the transmit/ receive threads or whoever queries the state
+        try:
+            while not self._killswitch:
+                self._supervisor_wake.wait(self._SUPERVISE_INTERVAL)
+                self._supervisor_wake.clear()
+                with self._port_lock:
+                    reopen = self._supervise()
+                if reopen is not None:
+                    self._reopen(*reopen)
+        except SystemExit:
+            self.kill()
+
+    def _supervise(self) -> tuple[str, bool, int] | None:
+        """Checks the link, returns (port, url, generation) when a reopen attempt is due"""
+        state = self._state
+        now = perf_counter()
+        if state in (LinkState.CONNECTED, LinkState.DEGRADED):
+            silence = None if self._last_rx is None else now - self._last_rx
+            if not self._healthy() or (self._port_rfc and silence is not None and silence > self._URL_LOST_SILENCE):
+                self._serial.close()
+                self._begin_recovery()
+            elif silence is not None and silence > self._DEGRADED_SILENCE:
+                self._set_state(LinkState.DEGRADED)
+            else:
+                self._set_state(LinkState.CONNECTED)
+        elif state in (LinkState.RECONNECTING, LinkState.LOST) and now >= self._next_attempt:
+            return self._port_name, self._port_rfc, self._port_generation
+        return None
+
+    def _reopen(self, port: str, url: bool, generation: int) -> None:
+        """One reconnect attempt, the port is opened outside _port_lock so connect()/ disconnect() never wait on it"""
+        serial_port = self._open_port(port, url)
+        with self._port_lock:
+            if generation != self._port_generation or self._state not in (LinkState.RECONNECTING, LinkState.LOST):
+                # The selection changed while opening, the result belongs to a port nobody wants anymore
+                if serial_port is not None:
+                    serial_port.close()
+                return
+            now = perf_counter()
+            if serial_port is not None:
+                self._attach(serial_port)
+                self._reconnects += 1
+                self._reconnect_time.add(now - self._down_since)
+                self._set_state(LinkState.CONNECTED)
+                return
+            self._next_attempt = now + self._backoff
+            self._backoff = min(self._backoff * 2, self._RECONNECT_MAX)
+            if now - self._down_since > self._LOST_AFTER:
+                self._set_state(LinkState.LOST)
+
+    def _port_failed(self) -> None:
+        self._port_error = True
+        self._supervisor_wake.set()
+
+    def send(self, buffer: bytes, kind: MessageType = MessageType.CONTROL) -> None:
+        """
+        Hands the payload `buffer` to the transmit thread, never blocks on the port.
+        An unsent older payload of the same kind is replaced
+        """
+        with self._tx_ready:
+            if kind in self._tx_packets:
+                self._coalesced += 1
+            self._tx_packets[kind] = buffer
+            self._tx_ready.notify()
+
+    @property
+    def sent(self) -> int:
+        return self._sent
+
+    @property
+    def coalesced(self) -> int:
+        """Payloads replaced by a newer one before the transmit thread got to them"""
+        return self._coalesced
 
     @property
-    def incoming(self):
-        return self._serial.in_waiting
+    def dropped(self) -> int:
+        """Payloads discarded because the port was disconnected or the write failed"""
+        return self._dropped
 
     @property
-    def next_line(self):
-        return self._serial.readline().decode()
+    def write_latency(self) -> RollingStats:
+        """Seconds spent in serial.write() per batch of frames"""
+        return self._write_latency
+
+    def _tx_loop(self):
+        try:
+            while not self._killswitch:
+                with self._tx_ready:
+                    self._tx_ready.wait_for(lambda: self._tx_packets or self._killswitch)
+                    packets, self._tx_packets = self._tx_packets, {}
+                if not packets:
+                    continue
+                if not self.connected:
+                    self._dropped += len(packets)
+                    continue
+                # Framed and stamped right before the write so sequence numbers only count frames put on the wire
+                if self._legacy:
+                    control = packets.pop(MessageType.CONTROL, None)
+                    self._dropped += len(packets)
+                    if control is None:
+                        continue
+                    wire = legacy_control_packet(control)
+                    packets = {MessageType.CONTROL: control}
+                else:
+                    wire = self._encoder.encode_many(list(packets.items()))
+                # Taken once: connect() or the supervisor may swap the port while the write is in progress
+                port = self._serial
+                start = perf_counter()
+                try:
+                    port.write(wire)
+                except serial.SerialTimeoutException:
+                    # The next packet supersedes this one anyway
+                    self._dropped += len(packets)
+                    continue
+                except (serial.SerialException, OSError):
+                    self._dropped += len(packets)
+                    # A write to a port that was closed and replaced meanwhile says nothing about the new one
+                    if port is self._serial:
+                        self._port_failed()
+                    continue
+                self._write_latency.add(perf_counter() - start)
+                self._sent += len(packets)
+        except SystemExit:
+            self.kill()
+
+    def kill(self):
+        self._killswitch = True
+        self._supervisor_wake.set()
+        with self._tx_ready:
+            self._tx_ready.notify_all()
+        for thread in (self._tx_thread, self._rx_thread, self._supervisor_thread):
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join()
+        self._serial.close()
+
+    def _rx_loop(self):
+        try:
+            while not self._killswitch:
+                port = self._serial
+                if not self.connected or not port.is_open:
+                    sleep(self._READ_TIMEOUT)
+                    continue
+                try:
+                    # Returns whatever arrived within the read timeout, partial frames are kept by the decoder
+                    data = port.read(max(1, port.in_waiting))
+                except (serial.SerialException, OSError, TypeError, AttributeError):
+                    # Port closed or swapped under us, the supervisor revives it if it's still selected
+                    if port is self._serial:
+                        self._port_failed()
+                    sleep(self._READ_TIMEOUT)
+                    continue
+                if not data:
+                    continue
+                frames = self._decoder.feed(data)
+                if frames:
+                    self._last_rx = perf_counter()
+                for frame in frames:
+                    if frame.kind == MessageType.TELEMETRY and self._reset_started is not None:
+                        self._last_reset_time = frame.received_at - self._reset_started
+                        self._reset_time.add(self._last_reset_time)
+                        self._reset_started = None
+                    handler = self._frame_handlers.get(frame.kind)
+                    if handler is not None:
+                        handler(frame)
+        except SystemExit:
+            self.kill()
 
     def __del__(self):
-        self._serial.close()
\ No newline at end of file
+        self._killswitch = True
+        self._supervisor_wake.set()
+        with self._tx_ready:
+            self._tx_ready.notify_all()
+        self._serial.close()
@@ -0,0 +1,84 @@
+"""
+    Fixed-size history of the most recent frames of a camera, for pausing and scrubbing back.
+    All frames live in one preallocated numpy block, pushing a frame is a copy into the next slot.
+    Frames are numbered in push order, so a frame keeps its index while newer ones keep arriving.
+"""
+
+import numpy as np
+
+
+class FrameHistory:
+    """Ring of the last frames, bounded by a memory cap and a maximum age"""
+
+    def __init__(self, max_bytes: int, max_seconds: float = 10.0):
+        self._max_bytes = max_bytes
+        self._max_seconds = max_seconds
+        self._frames: np.ndarray | None = None
+        self._timestamps: np.ndarray | None = None
+        self._pushed = 0  # Total number of frames pushed, slot of frame n is n % capacity
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._frames is None else self._frames.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self._frames is None else self._frames.nbytes
+
+    def _allocate(self, shape: tuple[int, ...], dtype) -> bool:
+        frame_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        capacity = self._max_bytes // frame_bytes
+        if capacity < 2:
+            self._frames = None
+            return False
+        self._frames = np.empty((capacity, *shape), dtype=dtype)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._pushed = 0
+        return True
+
+    def push(self, frame: np.ndarray, timestamp: float) -> None:
+        if self._frames is None or self._frames.shape[1:] != frame.shape or self._frames.dtype != frame.dtype:
+            # Only when the source resolution changes, the history of the old resolution is discarded
+            if not self._allocate(frame.shape, frame.dtype):
+                return
+        slot = self._pushed % self._frames.shape[0]
+        np.copyto(self._frames[slot], frame)
+        self._timestamps[slot] = timestamp
+        self._pushed += 1
+
+    def __len__(self) -> int:
+        """Number of frames available, not counting those older than `max_seconds` before the newest"""
+        count = min(self._pushed, self.capacity)
+        if count == 0:
+            return 0
+        newest = self._timestamps[(self._pushed - 1) % self.capacity]
+        ages = newest - self._timestamps[self._slots(count)]
+        return int(np.count_nonzero(ages <= self._max_seconds))
+
+    def _slots(self, count: int) -> np.ndarray:
+        """Slots of the `count` newest frames, newest first"""
+        return (self._pushed - 1 - np.arange(count)) % self.capacity
+
+    @property
+    def newest(self) -> int:
+        """Index of the newest frame, -1 while empty"""
+        return self._pushed - 1
+
+    @property
+    def oldest(self) -> int:
+        """Index of the oldest frame still available"""
+        return self._pushed - len(self)
+
+    def frame(self, index: int) -> tuple[np.ndarray, float]:
+        """Frame number `index` and its timestamp, valid until it is overwritten `capacity` pushes later"""
+        if not self.oldest <= index <= self.newest:
+            raise IndexError(index)
+        slot = index % self.capacity
+        return self._frames[slot], float(self._timestamps[slot])
+
+    def get(self, back: int) -> tuple[np.ndarray, float]:
+        """Frame `back` frames before the newest one (0 is the newest) and its timestamp"""
+        return self.frame(self.newest - back)
+
+    def clear(self) -> None:
+        self._pushed = 0
@@ -2,7 +2,9 @@
 Wrapper for PyGame with an RAII-conforming class 'Controller'.
 Manages the following:
    - Choosing one or none of the currently connected gamepads
-   - Regularly presenting the state of the keybindings
+   - Tracking the state of the keybindings from input events
+   - Sending packets on a drift-free fixed cadence, changes are sent immediately and restart the period
+   - Mixing the input into per-thruster commands (see mixing.py), sent instead of the raw axes if enabled
    - Regularly checking for, presenting and managing connection changes
    - Publishing a human-readable interface for reading the state of keybindings
    - TODO: support different types/ brands of gamepads - currently supports PS4/DS4 only
@@ -12,12 +14,17 @@ import struct
 import time
 from collections.abc import Callable
 from enum import Enum, StrEnum
-from functools import reduce
 from threading import Thread
 from typing import Any
 
+import numpy as np
 import pygame
 
+from .constants import CLIENT_MIXING, CONTROL_RATE, INPUT_EXPO, LEGACY_CONTROL_PACKETS, THRUSTER_ALLOCATION_FILE
+from .mixing import DEFAULT_ALLOCATION, THRUSTERS, ThrusterMixer, load_allocation
+from .protocol import MessageType
+from .scheduling import DeadlineScheduler
+
 
 class BindingNames(dict[str, list[str]], Enum):
     DS4 = {
@@ -52,6 +59,7 @@ class Controller:
     """Manages gamepad connection, gamepad selection, and gamepad bindings"""
 
     _gamepads: list[pygame.joystick.JoystickType]
+    _gamepad_names: list[str]
     _gamepad: pygame.joystick.JoystickType | None
     _type: str | None
     _gamepad_guid: str | None
@@ -60,12 +68,40 @@ class Controller:
     _handler_thread: Thread
     _send_payload: Callable[[Any], None] | None
     _STICK_DEADZONE = 0.12
+    # Toggle buttons ignore presses closer together than this (seconds)
+    _TOGGLE_DEBOUNCE = 0.2
+    # Below this pygame's millisecond event wait is too coarse, sleep instead
+    _FINE_WAIT = 0.002
+    _scheduler: DeadlineScheduler
+    _mixer: ThrusterMixer
+    _client_mixing: bool
+    _thruster_commands: tuple[float, ...]
 
-    def __init__(self, payload_callback=None) -> None:
+    def __init__(self, payload_callback=None, rate: float = CONTROL_RATE,
+                 client_mixing: bool = CLIENT_MIXING and not LEGACY_CONTROL_PACKETS) -> None:
+        """
+        `rate`: packets per second sent on a fixed cadence. Input changes are sent immediately and restart the
+        period, so packets are never further apart than one period
+        `client_mixing`: send mixed per-thruster commands (MessageType.THRUSTERS) instead of the raw axes
+        """
         pygame.init()
+        allocation = load_allocation(THRUSTER_ALLOCATION_FILE) if THRUSTER_ALLOCATION_FILE else DEFAULT_ALLOCATION
+        self._mixer = ThrusterMixer(allocation, deadzone=self._STICK_DEADZONE, expo=INPUT_EXPO)
+        self._client_mixing = client_mixing
+        self._thruster_commands = (0.0,) * len(THRUSTERS)
         self._gamepad = None
         self._gamepad_guid = None
         self._type = None
+        self._scheduler = DeadlineScheduler(rate)
+        # Only joystick events wake the handler loop
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([
+            pygame.JOYDEVICEADDED,
+            pygame.JOYDEVICEREMOVED,
+            pygame.JOYAXISMOTION,
+            pygame.JOYBUTTONDOWN,
+            pygame.JOYBUTTONUP,
+        ])
         pygame.event.pump()
         self._refresh_gamepads(connect_if_only_device=True)
         self._send_payload = payload_callback
@@ -75,11 +111,12 @@ class Controller:
         self._handler_thread.start()
 
     def _disconnect(self) -> None:
+        """Clears the selection only, the device list stays so the gamepad can be selected again"""
         self._gamepad = None
         self._gamepad_guid = None
         self._type = None
-        self._gamepads = []
         self._bindings_state = {}
+        self._thruster_commands = (0.0,) * len(THRUSTERS)
         return
 
     def _connect(self, i: int) -> None:
@@ -93,19 +130,38 @@ class Controller:
         gamepad_count = pygame.joystick.get_count()
         if gamepad_count == 0:
             self._disconnect()
+            self._gamepads = []
+            self._gamepad_names = []
             return
         self._gamepads = [pygame.joystick.Joystick(i) for i in range(gamepad_count)]
+        self._gamepad_names = [f"{gamepad.get_id()}: {gamepad.get_name()}" for gamepad in self._gamepads]
         for gamepad in self._gamepads:
             if gamepad.get_guid() == self._gamepad_guid:
                 self._gamepad = gamepad
                 return
+        # The selected gamepad was unplugged, keep none selected rather than its stale handle
+        self._disconnect()
         if connect_if_only_device:
             self._connect(0)
 
+    @property
+    def scheduler(self) -> DeadlineScheduler:
+        """Cadence of the control packets, holds the measured period and jitter"""
+        return self._scheduler
+
     @property
     def bindings_state(self):
         return self._bindings_state
 
+    @property
+    def thruster_commands(self) -> tuple[float, ...]:
+        """Mixed command of each thruster in [-1, 1], ordered as mixing.THRUSTERS"""
+        return self._thruster_commands
+
+    @property
+    def mixer(self) -> ThrusterMixer:
+        return self._mixer
+
     @property
     def payload_callback(self) -> Callable[[Any], None] | None:
         return self._send_payload
@@ -116,10 +172,8 @@ class Controller:
 
     @property
     def gamepads(self) -> list[str]:
-        self._refresh_gamepads()
-        return [
-            f"{gamepad.get_id()}: {gamepad.get_name()}" for gamepad in self._gamepads
-        ]
+        """Cached, refreshed by the handler loop when a device is added or removed"""
+        return self._gamepad_names
 
     @property
     def connected(self):
@@ -133,7 +187,7 @@ class Controller:
 
     @gamepad.setter
     def gamepad(self, index: int | None) -> None:
-        if index is None or index > len(self._gamepads):
+        if index is None or index >= len(self._gamepads):
             self._disconnect()
             return
         self._refresh_gamepads()
@@ -142,98 +196,156 @@ class Controller:
             if i.value == n:
                 self._connect(index)
 
+    def _read_state(self) -> dict[str, int | float]:
+        """Full state straight from the device, used when a gamepad is (re)connected"""
+        names = BindingNames[self._type]
+        state = {k: self._gamepad.get_button(i) for i, k in enumerate(names["buttons"])}
+        for i in range(len(names["axes"]) + len(names["triggers"])):
+            state.update(self._axis_state(i, self._gamepad.get_axis(i)))
+        return state
+
+    def _axis_state(self, axis: int, value: float) -> dict[str, float]:
+        names = BindingNames[self._type]
+        if axis < len(names["axes"]):
+            return {names["axes"][axis]: value if abs(value) > self._STICK_DEADZONE else 0}
+        trigger = axis - len(names["axes"])
+        if trigger < len(names["triggers"]):
+            return {names["triggers"][trigger]: (value + 1) / 2}
+        return {}
+
+    def _encode_payload(self, state: dict[str, int | float], led_and_valves: int) -> bytes:
+        # Keybindings:
+        # LStick - Axis 0 (Horizontal): Shift the ROV sideways
+        # LStick - Axis 1 (Vertical): Move forward/ backward
+        # RStick - Axis 2 (Horizontal): Rotate sideways about vertical axis
+        # RStick - Axis 3 (Vertical): Tilt up or down
+        # L2 - Axis 4 (+1 then /2): descend
+        # R2 - Axis 5 (+1 then / 2): climb
+        # Climb total value: R2 - L2
+        signed_payload = [
+            int(-254 * state["LS-V"]),
+            int(254 * state["LS-H"]),
+            int(-254 * state["RS-V"]),
+            int(254 * state["RS-H"]),
+            int(254 * (state["R2"] - state["L2"])),
+        ]
+
+        thruster_payload = [abs(byte) for byte in signed_payload]
+        sign_byte = 0
+        for i, byte in enumerate(signed_payload):
+            if byte < 0:
+                sign_byte |= 1 << i
+        payload = thruster_payload
+        payload.append(sign_byte)
+        payload.append(led_and_valves)
+
+        # Integrity and framing are added by the link (see protocol.py)
+        return struct.pack("7B", *payload)
+
+    @staticmethod
+    def _input_axes(state: dict[str, int | float]) -> np.ndarray:
+        # Same axes and signs as the control payload: surge, sway, pitch, yaw, heave
+        return np.array([-state["LS-V"], state["LS-H"], -state["RS-V"], state["RS-H"], state["R2"] - state["L2"]])
+
     def _handler_loop(self):
-        toggles_cooldown = [0, 0, 0]  # Debounce for toggleable options
+        # Touchpad Click - LED: 0000 0 LED 0      0
+        # L1, R1 - Valves:      0000 0 0   VALVE1 VALVE2
+        toggles = {"L1": 1, "TOUCHPAD": 4, "R1": 4}
+        last_toggled = {name: 0.0 for name in toggles}
         led_and_valves: int = 0
+        state: dict[str, int | float] = {}
+        active_id: int | None = None
+        last_payload: bytes | None = None
+        scheduler = self._scheduler
         try:
             while not self._killswitch:
-                time.sleep(0.015)
+                # Sleep until input arrives or the next packet is due, whichever comes first
+                wait = scheduler.time_until_next()
                 try:
-                    for event in pygame.event.get():
-                        if event.type == pygame.JOYDEVICEADDED:
-                            self._refresh_gamepads(connect_if_only_device=True)
-                        if event.type == pygame.JOYDEVICEREMOVED:
-                            self._refresh_gamepads()
+                    if wait > self._FINE_WAIT:
+                        events = [pygame.event.wait(int((wait - self._FINE_WAIT) * 1000) or 1)]
+                    else:
+                        time.sleep(max(0.0, wait))
+                        events = []
+                    events += pygame.event.get()
                 except Exception:
                     if self._killswitch:
                         break
-                if self._gamepad is None:
                     continue
 
-                buttons = {
-                    k: self._gamepad.get_button(i)
-                    for i, k in enumerate(BindingNames[self._type]["buttons"])
-                }
-                axes = {
-                    a: (
-                        self._gamepad.get_axis(i)
-                        if abs(self._gamepad.get_axis(i)) > self._STICK_DEADZONE
-                        else 0
-                    )
-                    for i, a in enumerate(BindingNames[self._type]["axes"])
-                }
-                triggers = {
-                    t: (
-                        self._gamepad.get_axis(
-                            i + len(BindingNames[self._type]["axes"])
-                        )
-                        + 1
-                    )
-                    / 2
-                    for i, t in enumerate(BindingNames[self._type]["triggers"])
-                }
-                self._bindings_state = {**buttons, **axes, **triggers}
+                # A different gamepad was selected, its state has to be read afresh
+                current_id = self._gamepad.get_instance_id() if self._gamepad is not None else None
+                if current_id != active_id:
+                    active_id = current_id
+                    state = {}
+
+                changed = False
+                for event in events:
+                    if event.type == pygame.JOYDEVICEADDED:
+                        self._refresh_gamepads(connect_if_only_device=True)
+                        state = {}
+                    elif event.type == pygame.JOYDEVICEREMOVED:
+                        self._refresh_gamepads()
+                        state = {}
+                    elif self._gamepad is None or not state:
+                        continue
+                    elif getattr(event, "instance_id", None) != self._gamepad.get_instance_id():
+                        continue
+                    elif event.type == pygame.JOYAXISMOTION:
+                        for name, value in self._axis_state(event.axis, event.value).items():
+                            if state[name] != value:
+                                state[name] = value
+                                changed = True
+                    elif event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+                        names = BindingNames[self._type]["buttons"]
+                        if event.button >= len(names):
+                            continue
+                        name = names[event.button]
+                        pressed = int(event.type == pygame.JOYBUTTONDOWN)
+                        if state[name] != pressed:
+                            state[name] = pressed
+                            changed = True
+                            if pressed and name in toggles:
+                                now = time.monotonic()
+                                if now - last_toggled[name] >= self._TOGGLE_DEBOUNCE:
+                                    last_toggled[name] = now
+                                    led_and_valves ^= toggles[name]
+
+                now = time.monotonic()
+                due = scheduler.due(now)
+                if due:
+                    # Ticks without a gamepad too, keeps the loop from spinning on a past deadline
+                    scheduler.tick(now)
+
+                if self._gamepad is None:
+                    if self._bindings_state:
+                        self._bindings_state = {}
+                        self._thruster_commands = (0.0,) * len(THRUSTERS)
+                    continue
+                if not state:
+                    # Events only carry changes, start from the device's current state
+                    state = self._read_state()
+                    changed = True
+                if changed:
+                    # Published as a new dict, readers never see a half-applied batch of events
+                    self._bindings_state = dict(state)
+                    commands = self._mixer.mix(self._input_axes(state))
+                    self._thruster_commands = tuple(commands.tolist())
 
                 if self._send_payload is None:
                     continue
-                # Keybindings:
-                # LStick - Axis 0 (Horizontal): Shift the ROV sideways
-                # LStick - Axis 1 (Vertical): Move forward/ backward
-                # RStick - Axis 2 (Horizontal): Rotate sideways about vertical axis
-                # RStick - Axis 3 (Vertical): Tilt up or down
-                # L2 - Axis 4 (+1 then /2): descend
-                # R2 - Axis 5 (+1 then / 2): climb
-                # Climb total value: R2 - L2
-                signed_payload = [
-                    int(-254 * self._bindings_state["LS-V"]),
-                    int(254 * self._bindings_state["LS-H"]),
-                    int(-254 * self._bindings_state["RS-V"]),
-                    int(254 * self._bindings_state["RS-H"]),
-                    int(
-                        254 * (self._bindings_state["R2"] - self._bindings_state["L2"])
-                    ),
-                ]
-
-                thruster_payload = [abs(byte) for byte in signed_payload]
-                sign_byte = 0
-                for i, byte in enumerate(signed_payload):
-                    if byte < 0:
-                        sign_byte |= 1 << i
-                payload = thruster_payload
-                payload.append(sign_byte)
-
-                # Touchpad Click - LED: 0000 0 LED 0      0
-                # L1, R1 - Valves:      0000 0 0   VALVE1 VALVE2
-                if toggles_cooldown[0] == 0 and self._bindings_state["L1"]:
-                    toggles_cooldown[0] = 15
-                    led_and_valves ^= 1
-                if toggles_cooldown[1] == 0 and self._bindings_state["TOUCHPAD"]:
-                    toggles_cooldown[1] = 15
-                    led_and_valves ^= 4
-                if toggles_cooldown[2] == 0 and self._bindings_state["R1"]:
-                    toggles_cooldown[2] = 15
-                    led_and_valves ^= 4
-                toggles_cooldown = [i - 1 if i > 0 else 0 for i in toggles_cooldown]
-                payload.append(led_and_valves)
-
-                # Checksum: XOR first 7 bytes
-                payload.append(reduce(lambda x, y: x ^ y, payload[:7]))
-
-                # Terminator byte
-                payload.append(255)
-                payload = struct.pack("9B", *payload)
-
-                self._send_payload(payload)
+                if self._client_mixing:
+                    kind = MessageType.THRUSTERS
+                    payload = self._mixer.encode(np.array(self._thruster_commands), led_and_valves)
+                else:
+                    kind = MessageType.CONTROL
+                    payload = self._encode_payload(state, led_and_valves)
+                if due or payload != last_payload:
+                    self._send_payload(payload, kind)
+                    last_payload = payload
+                    if not due:
+                        # The next periodic packet follows a full period after this one, not squeezed in right after
+                        scheduler.restart(now)
         except SystemExit:
             self.kill()
 
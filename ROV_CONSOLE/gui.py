@@ -1,8 +1,8 @@
-import random
 from functools import partial
+from time import perf_counter
 
 import requests
-from PySide6.QtCore import QTimer, Qt, QSize
+from PySide6.QtCore import Qt, QSize, QRect, QRectF, Signal
 from PySide6.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QBrush, QIcon
 from PySide6.QtWidgets import (
     QMainWindow,
@@ -16,15 +16,23 @@ from PySide6.QtWidgets import (
     QMenu,
     QInputDialog,
     QLineEdit,
+    QFileDialog,
+    QSlider,
     )
 
+from .constants import RECORDINGS_DIR, CAMERA_SOURCES, CONTROL_PROCESS, CONTROL_PRIORITY
+from .control_process import ControlProcess
 from .controller_widget import ControllerDisplay
 from .cv_stream import VideoStream
-from .esp32 import ESP32
+from .device_watcher import DeviceWatcher
+from .esp32 import ESP32, LinkState
 from .gamepad import Controller
+from .link_stats import LinkMonitor
 from .measurement_widget import MeasurementWindow
-
-RASPBERY_PI_IP = "192.168.1.2"
+from .mixing import THRUSTERS
+from .telemetry import Telemetry
+from .ui_scheduler import UiScheduler, Priority
+from .video_sources import resolve_source
 
 from os import path
 
@@ -34,13 +42,24 @@ camera_toolbar_icons = {
     "vflip":       QIcon(path.join(_, "flip-vertical.svg")),
     "measurement": QIcon(path.join(_, "ruler.svg")),
     "pano":        QIcon(path.join(_, "pano.svg")),
+    "stats":       QIcon(path.join(_, "stats.svg")),
+    "record":      QIcon(path.join(_, "record.svg")),
+    "pause":       QIcon(path.join(_, "pause.svg")),
     }
 
 
 class CameraWidget(QLabel):
+    # Emitted from the stream's capture thread, delivered queued on the GUI thread
+    frame_ready = Signal(int)
+
     def __init__(self, parent, cam):
         super().__init__(parent)
-        self._stream = VideoStream(cam)
+        self._shown_seq = -1
+        self._shown_timestamp = 0.0
+        self.frame_ready.connect(self._on_frame_ready)
+        self._stream = VideoStream(cam, on_frame=self.frame_ready.emit)
+        # Used for recording file names, URLs and paths reduced to something filesystem-safe
+        self._name = "cam" + "".join(c if c.isalnum() else "_" for c in str(cam))
         self.setAttribute(Qt.WidgetAttribute.WA_Hover)
         self.bottom_buttons = {}
         for b in camera_toolbar_icons:
@@ -56,14 +75,129 @@ class CameraWidget(QLabel):
         self.bottom_buttons["measurement"].clicked.connect(
             self._launch_length_measurement
             )
+        self.bottom_buttons["stats"].clicked.connect(self.toggle_stats_overlay)
+        self.bottom_buttons["record"].setCheckable(True)
+        self.bottom_buttons["record"].clicked.connect(self.toggle_recording)
+        self.bottom_buttons["pause"].setCheckable(True)
+        self.bottom_buttons["pause"].clicked.connect(self.toggle_pause)
+        self.bottom_buttons["pause"].setEnabled(self._stream.history is not None)
+
+        # Scrubs through the frame history while paused, 0 is the moment of pausing; the history keeps filling,
+        # so the range is brought up to date whenever the slider is grabbed or stepped
+        self.history_slider = QSlider(Qt.Orientation.Horizontal, self)
+        self.history_slider.setVisible(False)
+        self.history_slider.valueChanged.connect(lambda v: self._stream.seek(-v))
+        self.history_slider.sliderPressed.connect(self._update_history_range)
+        self.setFocusPolicy(Qt.FocusPolicy.ClickFocus)
+
+        self.stats_overlay = QLabel(self)
+        self.stats_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 160); color: white; font-family: monospace; padding: 4px;"
+            )
+        self.stats_overlay.move(8, 8)
+        self.stats_overlay.setVisible(False)
 
         self.measurement_window: QWidget | None = None
 
     def hflip(self):
         self.h_mirror = not self.h_mirror
+        self._stream.set_mirror(self.h_mirror, self.v_mirror)
 
     def vflip(self):
         self.v_mirror = not self.v_mirror
+        self._stream.set_mirror(self.h_mirror, self.v_mirror)
+
+    def toggle_stats_overlay(self):
+        visible = not self.stats_overlay.isVisible()
+        self.stats_overlay.setVisible(visible)
+        if visible:
+            self.refresh_stats_overlay()
+
+    def toggle_recording(self):
+        if self._stream.recording:
+            self._stream.stop_recording()
+        else:
+            self._stream.start_recording(RECORDINGS_DIR, self._name)
+        self.bottom_buttons["record"].setChecked(self._stream.recording)
+
+    def stop_recording(self):
+        """Returns right away, the backlog is encoded in the background"""
+        self._stream.stop_recording()
+        self.bottom_buttons["record"].setChecked(False)
+
+    def shutdown(self):
+        """Finishes a running recording so its last segment is complete, then stops the stream"""
+        self.stop_recording()
+        recorder = self._stream.recorder
+        if recorder is not None:
+            recorder.wait()
+        self._stream.kill()
+
+    def toggle_pause(self):
+        if self._stream.paused:
+            self._stream.resume()
+            self.history_slider.setVisible(False)
+        elif self._stream.pause():
+            self._update_history_range()
+            self.history_slider.setValue(0)
+            self._place_history_slider()
+            self.history_slider.setVisible(True)
+            self.history_slider.raise_()
+            self.setFocus()
+        self.bottom_buttons["pause"].setChecked(self._stream.paused)
+
+    def _update_history_range(self):
+        back, ahead = self._stream.history_range()
+        # Without emitting valueChanged, clamping the value must not move the shown frame
+        self.history_slider.blockSignals(True)
+        self.history_slider.setRange(-back, ahead)
+        self.history_slider.blockSignals(False)
+
+    def _place_history_slider(self):
+        self.history_slider.setGeometry(8, self.height() - self.height() // 10 - 32, self.width() - 16, 24)
+
+    def keyPressEvent(self, event):
+        # Frame stepping while paused
+        if self._stream.paused and event.key() in (Qt.Key.Key_Left, Qt.Key.Key_Right):
+            step = 1 if event.key() == Qt.Key.Key_Right else -1
+            self._update_history_range()
+            self.history_slider.setValue(self.history_slider.value() + step)
+            return
+        if event.key() == Qt.Key.Key_Space and self._stream.history is not None:
+            self.toggle_pause()
+            return
+        super().keyPressEvent(event)
+
+    def refresh_stats_overlay(self):
+        """Driven by MainWindow's UI scheduler, does nothing while the overlay is hidden"""
+        if not self.stats_overlay.isVisible():
+            return
+        text = self._stream.stats.summary()
+        recorder = self._stream.recorder
+        if recorder is not None:
+            state = "REC" if recorder.running else "rec finishing" if recorder.finishing else "rec stopped"
+            text += f"\n{state}: {recorder.encoded} encoded, {recorder.dropped} dropped, {recorder.queued} queued"
+        self.stats_overlay.setText(text)
+        self.stats_overlay.adjustSize()
+        self.stats_overlay.raise_()
+
+    def export_stats(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Video Statistics", "video_stats.csv", "CSV (*.csv)")
+        if file_path:
+            self._stream.stats.export_csv(file_path)
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        menu.addAction("Toggle Statistics Overlay").triggered.connect(self.toggle_stats_overlay)
+        menu.addAction("Export Video Statistics...").triggered.connect(self.export_stats)
+        if self._stream.history is not None:
+            menu.addAction("Resume Live" if self._stream.paused else "Pause and Rewind").triggered.connect(
+                self.toggle_pause
+                )
+        menu.addAction("Stop Recording" if self._stream.recording else "Start Recording").triggered.connect(
+            self.toggle_recording
+            )
+        menu.exec(event.globalPos())
 
     def enterEvent(self, event):
         w = self.width() // 4
@@ -79,30 +213,52 @@ class CameraWidget(QLabel):
             b.setVisible(False)
 
     def _pixmap_from_frame(self):
-        frame = self._stream.frame
-        q_image = (
-            QImage(
-                frame.data,
-                frame.shape[1],
-                frame.shape[0],
-                frame.strides[0],
-                QImage.Format.Format_BGR888,
-                )
-            .smoothScaled(self.width(), self.height())
-            .mirrored(horizontally=self.h_mirror, vertically=self.v_mirror)
-        )
+        # Already scaled, mirrored and converted by the stream's capture thread
+        frame = self._stream.display_frame
+        q_image = QImage(
+            frame.data,
+            frame.shape[1],
+            frame.shape[0],
+            frame.strides[0],
+            QImage.Format.Format_RGB888,
+            )
         return QPixmap.fromImage(q_image)
 
     def _launch_length_measurement(self):
         self.measurement_window = MeasurementWindow(self, self._pixmap_from_frame())
 
+    def _on_frame_ready(self, seq):
+        # Signals queue up while the GUI thread is busy, only the newest frame is worth drawing
+        if seq < self._stream.seq or seq == self._shown_seq:
+            return
+        self._stream.stats.record("queue", perf_counter() - self._stream.published_at)
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # The stream re-renders at the new size and notifies through frame_ready
+        self._stream.display_size = (self.width(), self.height())
+        self._place_history_slider()
+
     def update(self):
+        paint_start = perf_counter()
+        self._shown_seq = self._stream.seq
+        captured = self._stream.timestamp
         self.setPixmap(self._pixmap_from_frame())
+        painted = perf_counter()
+        stats = self._stream.stats
+        stats.record("paint", painted - paint_start)
+        if captured != self._shown_timestamp:
+            # Re-renders of an already shown capture (resize, mirroring) are not end-to-end latency
+            stats.record("total", painted - captured)
+            stats.display_rate.tick(painted)
+        self._shown_timestamp = captured
 
 
 class OrientationsWidget(QWidget):
-    def __init__(self, parent):
+    def __init__(self, parent, telemetry: Telemetry):
         super().__init__(parent)
+        self._telemetry = telemetry
 
         self.setMinimumSize(parent.width() // 3, parent.height() // 2)
 
@@ -123,21 +279,35 @@ class OrientationsWidget(QWidget):
         self.update()
 
     def update(self):
-        depthReading = random.randint(0, 10)
-        yawReading = random.randint(0, 10)
-        pitchReading = random.randint(0, 10)
-        rollReading = random.randint(0, 10)
+        sample = self._telemetry.latest
+        if sample is None:
+            self.depthLabel.setText("Depth: --")
+            self.yawLabel.setText("Yaw: --")
+            self.pitchLabel.setText("Pitch: --")
+            self.rollLabel.setText("Roll: --")
+            return
 
-        self.depthLabel.setText("Depth: " + str(depthReading))
-        self.yawLabel.setText("Yaw: " + str(yawReading))
-        self.pitchLabel.setText("Pitch: " + str(pitchReading))
-        self.rollLabel.setText("Roll: " + str(rollReading))
+        self.depthLabel.setText(f"Depth: {sample.depth:.2f} m")
+        self.yawLabel.setText(f"Yaw: {sample.yaw:.1f}°")
+        self.pitchLabel.setText(f"Pitch: {sample.pitch:.1f}°")
+        self.rollLabel.setText(f"Roll: {sample.roll:.1f}°")
 
 
 class ThrustersWidget(QWidget):
-    def __init__(self, parent):
+    # Where each thruster is drawn: top/ bottom circles for the vertical ones, rotated squares in the corners
+    _SHAPES = {
+        "vertical_front": "circle",
+        "vertical_back": "circle",
+        "front_left": "square",
+        "front_right": "square",
+        "back_left": "square",
+        "back_right": "square",
+        }
+
+    def __init__(self, parent, controller):
         super().__init__(parent)
         self.parent = parent
+        self._controller = controller
 
         self.setMinimumSize(parent.width() // 3, parent.height() // 4)
 
@@ -147,61 +317,25 @@ class ThrustersWidget(QWidget):
         self.rightfrontLabel = QLabel(self)
         self.leftbackLabel = QLabel(self)
         self.rightbackLabel = QLabel(self)
-
-        # Default colors
-        self.square_color = QColor(0, 0, 0)  # Black for center square
-
-        self.circle_colors = [
-            QColor(0, 255, 0),  # Top
-            QColor(0, 255, 0),
-            # ,  # Bottom
-            # # QColor(0, 255, 0),  # Left
-            # QColor(0, 255, 0)   # Right
-            ]
-
-        self.rotated_square_colors = [
-            QColor(0, 255, 0),  # Front-left
-            QColor(0, 255, 0),  # Front-right
-            QColor(0, 255, 0),  # Back-left
-            QColor(0, 255, 0),  # Back-right
-            ]
-
-    def set_colors(self):
-        """Allows changing colors dynamically"""
-
-        frontRightSpeed = 0
-        backRightSpeed = 255
-        frontLeftSpeed = 100
-        backLeftSpeed = 200
-        upFrontSpeed = 50
-        upBackSpeed = 150
-
-        self.frontLabel.setText(str(upFrontSpeed))
-        self.backLabel.setText(str(upBackSpeed))
-        self.leftfrontLabel.setText(str(frontLeftSpeed))
-        self.rightfrontLabel.setText(str(frontRightSpeed))
-        self.leftbackLabel.setText(str(backLeftSpeed))
-        self.rightbackLabel.setText(str(backRightSpeed))
-
-        self.square_color = QColor(0, 0, 0)
-        self.circle_colors = [
-            QColor(upFrontSpeed, 255 - upFrontSpeed, 0),  # Top
-            QColor(upBackSpeed, 255 - upBackSpeed, 0),
-            # ,  # Bottom
-            # QColor(0, 255, 0),  # Left
-            # QColor(0, 255, 0)   # Right
-            ]
-        self.rotated_square_colors = [
-            QColor(frontLeftSpeed, 255 - frontLeftSpeed, 0),  # Front-left
-            QColor(frontRightSpeed, 255 - frontRightSpeed, 0),  # Front-right
-            QColor(backLeftSpeed, 255 - backLeftSpeed, 0),  # Back-left
-            QColor(backRightSpeed, 255 - backRightSpeed, 0),  # Back-right
-            ]
-
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
+        self._labels = {
+            "vertical_front": self.frontLabel,
+            "vertical_back": self.backLabel,
+            "front_left": self.leftfrontLabel,
+            "front_right": self.rightfrontLabel,
+            "back_left": self.leftbackLabel,
+            "back_right": self.rightbackLabel,
+            }
+
+        self.square_color = QColor(0, 0, 0)  # Black outlines
+        # Shown value per thruster, as color level (0-255) and label text; only changes cause repaints
+        self._levels = dict.fromkeys(THRUSTERS, 0)
+        self._texts = dict.fromkeys(THRUSTERS, "")
+        # Geometry, recomputed on resize only
+        self._centers: dict[str, tuple[int, int]] = {}
+        self._radius = 0
+        self._static: QPixmap | None = None
+
+    def _layout(self):
         # Get parent size constraints
         max_width = self.parent.width() // 3
         max_height = self.parent.height() // 4
@@ -213,80 +347,89 @@ class ThrustersWidget(QWidget):
             )  ###changing the ratio changes the thrusters size###
         square_x = (self.width() - square_size) // 2
         square_y = (self.height() - square_size) // 2
-
-        # Draw the black center square
+        left = square_x - square_size // 3
+        right = square_x + square_size + square_size // 3
+        top = square_y - square_size // 3
+        bottom = square_y + square_size + square_size // 3
+        middle = square_x + square_size // 2
+        self._centers = {
+            "vertical_front": (middle, top),
+            "vertical_back": (middle, bottom),
+            "front_left": (left, top),
+            "front_right": (right, top),
+            "back_left": (left, bottom),
+            "back_right": (right, bottom),
+            }
+        self._radius = int(square_size * 0.2)
+        for name, (x, y) in self._centers.items():
+            self._labels[name].setGeometry(x - 10, y - 15, 100, 30)  # (x, y, width, height)
+
+        # The center square never changes color, it's drawn once per size
+        ratio = self.devicePixelRatioF()
+        self._static = QPixmap(QSize(max(1, self.width()), max(1, self.height())) * ratio)
+        self._static.setDevicePixelRatio(ratio)
+        self._static.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(self._static)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         painter.setPen(QPen(self.square_color, 3))
         painter.setBrush(QBrush(Qt.BrushStyle.NoBrush))
         painter.drawRect(square_x, square_y, square_size, square_size)
+        painter.end()
 
-        # Circles' and Rotated Squares' Positions
-        offsets = [
-            (square_x + square_size // 2, square_y - square_size // 3),  # Top
-            (square_x + square_size // 2, square_y + square_size + square_size // 3),
-            # ,  # Bottom
-            # (square_x - square_size // 3, square_y + square_size // 2),  # Left
-            # (square_x + square_size + square_size // 3, square_y + square_size // 2)  # Right
-            ]
-
-        rotated_offsets = [
-            (square_x - square_size // 3, square_y - square_size // 3),  # Top-left
-            (
-                square_x + square_size + square_size // 3,
-                square_y - square_size // 3,
-                ),  # Top-right
-            (
-                square_x - square_size // 3,
-                square_y + square_size + square_size // 3,
-                ),  # Bottom-left
-            (
-                square_x + square_size + square_size // 3,
-                square_y + square_size + square_size // 3,
-                ),  # Bottom-right
-            ]
-
-        self.frontLabel.setGeometry(
-            offsets[0][0] - 10, offsets[0][1] - 15, 100, 30
-            )  # (x, y, width, height)
-        self.backLabel.setGeometry(offsets[1][0] - 10, offsets[1][1] - 15, 100, 30)
-        self.leftfrontLabel.setGeometry(
-            rotated_offsets[0][0] - 10, rotated_offsets[0][1] - 15, 100, 30
-            )
-        self.rightfrontLabel.setGeometry(
-            rotated_offsets[1][0] - 10, rotated_offsets[1][1] - 15, 100, 30
-            )
-        self.leftbackLabel.setGeometry(
-            rotated_offsets[2][0] - 10, rotated_offsets[2][1] - 15, 100, 30
-            )
-        self.rightbackLabel.setGeometry(
-            rotated_offsets[3][0] - 10, rotated_offsets[3][1] - 15, 100, 30
-            )
+    def _thruster_rect(self, name) -> QRect:
+        x, y = self._centers[name]
+        # Covers the 45 degree rotated squares (half diagonal r * sqrt(2)) and the outline
+        extent = int(self._radius * 1.5) + 3
+        return QRect(x - extent, y - extent, 2 * extent, 2 * extent)
 
-        circle_radius = int(square_size * 0.2)
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._layout()
 
-        # Draw Circles with individual colors
-        for i, (x, y) in enumerate(offsets):
-            painter.setBrush(QBrush(self.circle_colors[i]))
-            painter.drawEllipse(
-                x - circle_radius,
-                y - circle_radius,
-                circle_radius * 2,
-                circle_radius * 2,
-                )
+    def set_colors(self):
+        """Takes the controller's mixed thruster commands, returns the region whose drawing changed"""
+        dirty = QRect()
+        for name, command in zip(THRUSTERS, self._controller.thruster_commands):
+            text = f"{command * 100:+.0f}%"
+            if text != self._texts[name]:
+                self._texts[name] = text
+                self._labels[name].setText(text)
+            level = int(abs(command) * 255)
+            if level != self._levels[name]:
+                self._levels[name] = level
+                if self._centers:
+                    dirty = dirty.united(self._thruster_rect(name))
+        return dirty
 
-        # Draw Rotated Squares with individual colors
-        for i, (x, y) in enumerate(rotated_offsets):
-            painter.setBrush(QBrush(self.rotated_square_colors[i]))
+    def paintEvent(self, event):
+        if self._static is None:
+            self._layout()
+        painter = QPainter(self)
+        region = event.rect()
+        painter.drawPixmap(QRectF(region), self._static, QRectF(region.topLeft() * self._static.devicePixelRatio(),
+                                                        region.size() * self._static.devicePixelRatio()))
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(self.square_color, 3))
+        radius = self._radius
+        for name, (x, y) in self._centers.items():
+            if not self._thruster_rect(name).intersects(region):
+                continue
+            # Green at rest to red at full thrust either way
+            level = self._levels[name]
+            painter.setBrush(QBrush(QColor(level, 255 - level, 0)))
+            if self._SHAPES[name] == "circle":
+                painter.drawEllipse(x - radius, y - radius, radius * 2, radius * 2)
+                continue
             painter.save()
             painter.translate(x, y)
             painter.rotate(45)  # Rotate by 45 degrees
-            painter.drawRect(
-                -circle_radius, -circle_radius, circle_radius * 2, circle_radius * 2
-                )
+            painter.drawRect(-radius, -radius, radius * 2, radius * 2)
             painter.restore()
 
     def updateThrusters(self):
-        self.set_colors()
-        self.update()
+        dirty = self.set_colors()
+        if not dirty.isNull():
+            self.update(dirty)
 
 
 class MainWindow(QMainWindow):
@@ -297,14 +440,20 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("AU Robotics ROV GUI")
 
         self.state = self.windowState()
-        self.controller = Controller()
-        self.esp = ESP32()
+        if CONTROL_PROCESS:
+            # Same interface, backed by proxies of the objects living in the control process
+            self.control_process = ControlProcess(raise_priority=CONTROL_PRIORITY)
+            self.controller = self.control_process.controller
+            self.esp = self.control_process.esp
+            self.link_monitor = self.control_process.link_monitor
+        else:
+            self.control_process = None
+            self.controller = Controller()
+            self.esp = ESP32()
+            self.link_monitor = LinkMonitor(self.esp)
+        self.esp.subscribe(self.on_link_state)
         self.initUI()
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.updateFrame)
-        self.timer.start(15)
-
     def initUI(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -316,15 +465,44 @@ class MainWindow(QMainWindow):
             except requests.RequestException:
                 return False
 
-        self.leftCameraWidget = CameraWidget(self, 0)
-        self.middleCameraWidget = CameraWidget(self, 1)
-        self.rightCameraWidget = CameraWidget(self, 2)
-        self.orientationsWidget = OrientationsWidget(self)
-        self.controllerWidget = ControllerDisplay(self.controller)
-        self.thrustersWidget = ThrustersWidget(self)
+        # Streams open in the background, missing entries show the no-video indicator
+        cameras = [resolve_source(spec) for spec in CAMERA_SOURCES] + [None] * 3
+        self.leftCameraWidget = CameraWidget(self, cameras[0])
+        self.middleCameraWidget = CameraWidget(self, cameras[1])
+        self.rightCameraWidget = CameraWidget(self, cameras[2])
+        self.orientationsWidget = OrientationsWidget(self, self.esp.telemetry)
+        self.controllerWidget = ControllerDisplay(self.controller, autopoll=False)
+        self.thrustersWidget = ThrustersWidget(self, self.controller)
         self.tasksWidget = QScrollArea(self)
 
         self.menu_bar = self.menuBar()
+        # Link quality next to the menus, survives the menu rebuilds
+        self.link_label = QLabel(self.menu_bar)
+        self.menu_bar.setCornerWidget(self.link_label, Qt.Corner.TopRightCorner)
+        # Menus are rebuilt only when ports or gamepads come and go, or the selection changes
+        self.device_watcher = DeviceWatcher(self.esp, self.controller)
+        self._menu_dirty = False
+        self.device_watcher.changed.connect(self.invalidateMenuBar)
+        self.createMenuBar()
+        self.control_label = QLabel(self)
+        self.statusBar().addPermanentWidget(self.control_label)
+        self.ui_label = QLabel(self)
+        self.statusBar().addPermanentWidget(self.ui_label)
+
+        # All periodic GUI work, control feedback first; cameras repaint on their own frame signals
+        self.ui_scheduler = UiScheduler(self)
+        self.ui_scheduler.add("thrusters", self.thrustersWidget.updateThrusters, 60, Priority.HIGH)
+        self.ui_scheduler.add("controller", self.controllerWidget.poll, self.controller.scheduler.rate, Priority.HIGH)
+        self.ui_scheduler.add("orientation", self.orientationsWidget.update, 30)
+        self.ui_scheduler.add("link", self.updateLinkLabel, 2, Priority.LOW)
+        self.ui_scheduler.add("control", self.updateControlLabel, 2, Priority.LOW)
+        self.ui_scheduler.add("ui", self.updateUiLabel, 1, Priority.LOW)
+        self.ui_scheduler.add("menu", self.refreshMenuBar, 10, Priority.LOW)
+        cameras = {"left": self.leftCameraWidget, "middle": self.middleCameraWidget, "right": self.rightCameraWidget}
+        for side, camera in cameras.items():
+            self.ui_scheduler.add(f"stats {side}", camera.refresh_stats_overlay, 4, Priority.LOW)
+        self.ui_scheduler.overrun.connect(self.on_ui_overrun)
+        self.ui_scheduler.start()
         self.initTasks()
 
         grid = QGridLayout()
@@ -364,7 +542,7 @@ class MainWindow(QMainWindow):
         port_menu = QMenu("Serial Port", self)
         port_is_from_choices = False
         self.menu_bar.addMenu(port_menu)
-        for i in self.esp.available_ports:
+        for i in self.device_watcher.ports:
             port_sel = port_menu.addAction(f"{i}")
             port_sel.setCheckable(True)
             if i == self.esp.port:
@@ -379,60 +557,106 @@ class MainWindow(QMainWindow):
         port_menu.addSeparator()
         manual_port_selection = port_menu.addAction("Custom Port Selection")
         manual_port_selection.triggered.connect(partial(self.manual_port_selection))
-        if self.esp.connected:
+        export_link_stats = port_menu.addAction("Export Link Statistics")
+        export_link_stats.triggered.connect(self.export_link_stats)
+        if self.device_watcher.connected:
             reset_esp = port_menu.addAction("Reset ESP")
             reset_esp.triggered.connect(self.esp.reset)
 
-        if not self.controller.gamepads:
+        if not self.device_watcher.gamepads:
             return
         controller_menu = QMenu("Controller", self)
         self.menu_bar.addMenu(controller_menu)
-        for gp in self.controller.gamepads:
+        for gp in self.device_watcher.gamepads:
             gp_sel = controller_menu.addAction(f"{gp}")
             gp_sel.triggered.connect(partial(self.toggle_controller, gp))
             gp_sel.setCheckable(True)
             if self.controller.gamepad == gp:
                 gp_sel.setChecked(True)
 
+    def invalidateMenuBar(self):
+        # Rebuilt by the "menu" task, within the UI scheduler's budget
+        self._menu_dirty = True
+
+    def refreshMenuBar(self):
+        if self._menu_dirty:
+            self._menu_dirty = False
+            self.createMenuBar()
+
     def manual_port_selection(self):
         text, ok = QInputDialog.getText(
             self,
             "Custom Port",
-            "Port Name (RFC2217 NOT FULLY SUPPORTED):",
+            "Port Name or pySerial URL (rfc2217://host:port):",
             QLineEdit.EchoMode.Normal,
             "COM",
             )
         if ok:
             self.toggle_port(text)
 
+    def export_link_stats(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Link Statistics", "link_stats.csv", "CSV (*.csv)")
+        if file_path:
+            self.link_monitor.export_csv(file_path)
+
+    def updateLinkLabel(self):
+        if self.esp.port is None:
+            self.link_label.setText("Serial: disconnected  ")
+            return
+        reconnects = f"  reconnects {self.esp.reconnects}" if self.esp.reconnects else ""
+        if self.esp.last_reset_time is not None:
+            reconnects += f"  reset {self.esp.last_reset_time * 1000:.0f} ms"
+        if not self.esp.connected:
+            self.link_label.setText(f"Serial: {self.esp.port} {self.esp.state}{reconnects}  ")
+            return
+        self.link_label.setText(f"Serial: {self.esp.port} {self.esp.state}  {self.link_monitor.summary()}{reconnects}  ")
+
+    def updateControlLabel(self):
+        self.control_label.setText(f"Control loop: {self.controller.scheduler.summary()}")
+
+    def updateUiLabel(self):
+        self.ui_label.setText(self.ui_scheduler.summary())
+        self.ui_label.setToolTip("\n".join(self.ui_scheduler.report()))
+
+    def on_ui_overrun(self, task, seconds):
+        self.statusBar().showMessage(f"UI tick over budget: {seconds * 1e3:.1f} ms, slowest {task}", 2000)
+
+    def on_link_state(self, old, new):
+        # Called off the GUI thread: back from a reset or an outage, the controller is re-attached to the link
+        if new == LinkState.CONNECTED and old in (LinkState.RESETTING, LinkState.RECONNECTING, LinkState.LOST):
+            self.link_monitor.reset()
+            self.controller.payload_callback = self.esp.send
+
     def toggle_port(self, port):
         if self.esp.port == port:
             self.esp.disconnect()
             self.controller.payload_callback = None
         else:
             self.esp.connect(port)
+            self.link_monitor.reset()
             self.controller.payload_callback = self.esp.send
+        self.device_watcher.refresh()
 
     def toggle_controller(self, indexed_name):
-        if self.controller.connected:
-            if indexed_name == self.controller.gamepad:
-                self.controller.gamepad = None
-                return
-        i = indexed_name[: indexed_name.find(":")]
-        self.controller.gamepad = int(i)
-
-    def updateFrame(self):
-        if self.state != self.windowState():
-            self.state = self.windowState()
-        self.orientationsWidget.update()
-        self.thrustersWidget.updateThrusters()
-        self.createMenuBar()
-        self.leftCameraWidget.update()
-        self.middleCameraWidget.update()
-        self.rightCameraWidget.update()
-        if self.esp.connected:
-            while self.esp.incoming:
-                print(self.esp.next_line)
+        if self.controller.connected and indexed_name == self.controller.gamepad:
+            self.controller.gamepad = None
+        else:
+            i = indexed_name[: indexed_name.find(":")]
+            self.controller.gamepad = int(i)
+        self.device_watcher.refresh()
+
+    def closeEvent(self, event):
+        self.ui_scheduler.stop()
+        cameras = (self.leftCameraWidget, self.middleCameraWidget, self.rightCameraWidget)
+        # All recorders stop first so their backlogs are encoded in parallel, then each is waited for
+        for camera in cameras:
+            camera.stop_recording()
+        for camera in cameras:
+            camera.shutdown()
+        if self.control_process is not None:
+            # The child owns the serial port, it is closed cleanly rather than left to notice the pipe closing
+            self.control_process.kill()
+        super().closeEvent(event)
 
     def initTasks(self):
         tasksContainer = QWidget()
@@ -0,0 +1,160 @@
+"""
+    Round-trip latency and loss of the serial link, measured with PING frames the ESP32 echoes as PONG.
+    Probe payload: uint32 probe id | float64 perf_counter() at send time, the echo carries it back unchanged.
+    Probes only go out while the link is connected, time without a link is not counted as loss.
+"""
+
+import csv
+import struct
+import threading
+from time import perf_counter, sleep, time
+
+from .esp32 import LinkState
+from .protocol import MessageType, Frame
+from .stats import RollingStats
+
+_PROBE = struct.Struct("<Id")
+# States in which the port is open, a quiet ESP32 (DEGRADED) losing probes is real loss
+_LINKED = (LinkState.CONNECTED, LinkState.DEGRADED)
+
+
+class LinkMonitor:
+    """Probes the link at a fixed interval, keeps RTT percentiles, jitter and loss"""
+
+    def __init__(self, esp, interval: float = 0.2, timeout: float = 1.0):
+        self._esp = esp
+        self._interval = interval
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._outstanding: dict[int, float] = {}
+        self._sent = 0
+        self._received = 0
+        self._lost = 0
+        self._rtt = RollingStats(500)
+        self._last_rtt: float | None = None
+        self._jitter = 0.0
+        # Every RTT of the session as (wall time, seconds), for export
+        self._session: list[tuple[float, float]] = []
+        self._session_start = time()
+        esp.set_frame_handler(MessageType.PONG, self._on_pong)
+        esp.subscribe(self._on_link_state)
+        self._killswitch = False
+        self._probe_thread = threading.Thread(target=self._probe_loop, daemon=True)
+        self._probe_thread.start()
+
+    @property
+    def sent(self) -> int:
+        return self._sent
+
+    @property
+    def received(self) -> int:
+        return self._received
+
+    @property
+    def lost(self) -> int:
+        return self._lost
+
+    @property
+    def loss_rate(self) -> float:
+        settled = self._received + self._lost
+        return self._lost / settled if settled else 0.0
+
+    @property
+    def rtt(self) -> RollingStats:
+        return self._rtt
+
+    @property
+    def jitter(self) -> float:
+        """Smoothed RTT variation in seconds, estimator from RFC 3550"""
+        return self._jitter
+
+    def summary(self) -> str:
+        if not self._rtt.count:
+            return "RTT --"
+        p50, p95, p99 = self._rtt.percentiles()
+        return (f"RTT {p50 * 1e3:.1f}/{p95 * 1e3:.1f}/{p99 * 1e3:.1f} ms  "
+                f"jitter {self._jitter * 1e3:.1f} ms  loss {self.loss_rate * 100:.1f}%")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._outstanding.clear()
+            self._sent = self._received = self._lost = 0
+            self._rtt = RollingStats(500)
+            self._last_rtt = None
+            self._jitter = 0.0
+            self._session = []
+            self._session_start = time()
+
+    def export_csv(self, file_path: str) -> None:
+        with self._lock:
+            session = list(self._session)
+        with open(file_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            p50, p95, p99 = self._rtt.percentiles()
+            writer.writerow(["session_start", self._session_start])
+            writer.writerow(["probes_sent", self._sent])
+            writer.writerow(["probes_received", self._received])
+            writer.writerow(["probes_lost", self._lost])
+            writer.writerow(["loss_rate", f"{self.loss_rate:.4f}"])
+            writer.writerow(["rtt_p50_ms", f"{p50 * 1e3:.3f}"])
+            writer.writerow(["rtt_p95_ms", f"{p95 * 1e3:.3f}"])
+            writer.writerow(["rtt_p99_ms", f"{p99 * 1e3:.3f}"])
+            writer.writerow(["jitter_ms", f"{self._jitter * 1e3:.3f}"])
+            writer.writerow([])
+            writer.writerow(["wall_time", "rtt_ms"])
+            for wall, rtt in session:
+                writer.writerow([f"{wall:.6f}", f"{rtt * 1e3:.3f}"])
+
+    def _on_pong(self, frame: Frame) -> None:
+        if len(frame.payload) != _PROBE.size:
+            return
+        probe_id, sent_at = _PROBE.unpack(frame.payload)
+        with self._lock:
+            if self._outstanding.pop(probe_id, None) is None:
+                # Already counted as lost, or from before a reset
+                return
+            rtt = frame.received_at - sent_at
+            self._received += 1
+            self._rtt.add(rtt)
+            if self._last_rtt is not None:
+                self._jitter += (abs(rtt - self._last_rtt) - self._jitter) / 16
+            self._last_rtt = rtt
+            self._session.append((time(), rtt))
+
+    def _on_link_state(self, old, new) -> None:
+        # Probes in flight across a drop, reconnect or reset never had a link to come back over
+        if old not in _LINKED or new not in _LINKED:
+            with self._lock:
+                self._outstanding.clear()
+
+    def _expire(self, now: float) -> None:
+        with self._lock:
+            expired = [i for i, sent_at in self._outstanding.items() if now - sent_at > self._timeout]
+            for i in expired:
+                del self._outstanding[i]
+            self._lost += len(expired)
+
+    def _probe_loop(self) -> None:
+        try:
+            while not self._killswitch:
+                now = perf_counter()
+                self._expire(now)
+                # Legacy packets can't carry probes, the transmit thread drops them while reconnecting
+                if self._esp.connected and not self._esp.legacy:
+                    with self._lock:
+                        probe_id = self._next_id
+                        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+                        self._outstanding[probe_id] = now
+                        self._sent += 1
+                    self._esp.send(_PROBE.pack(probe_id, now), MessageType.PING)
+                sleep(self._interval)
+        except SystemExit:
+            self.kill()
+
+    def kill(self) -> None:
+        self._killswitch = True
+        self._esp.set_frame_handler(MessageType.PONG, None)
+        self._esp.unsubscribe(self._on_link_state)
+        if self._probe_thread.is_alive() and self._probe_thread is not threading.current_thread():
+            self._probe_thread.join()
@@ -0,0 +1,85 @@
+"""
+    Client-side thruster mixing: turns the pilot's input axes into one command per thruster.
+
+    Each axis is shaped by a response curve (deadzone + expo) read from a precomputed lookup table,
+    the shaped vector is multiplied by the thruster allocation matrix (rows: thrusters, columns: axes),
+    and the result is scaled down as a whole when any thruster would saturate, so the commanded
+    direction of motion is kept instead of clipping single thrusters.
+"""
+
+import struct
+
+import numpy as np
+
+# Column order of the allocation matrix, same order as the axes of the 7-byte control payload
+AXES = ("surge", "sway", "pitch", "yaw", "heave")
+THRUSTERS = ("front_left", "front_right", "back_left", "back_right", "vertical_front", "vertical_back")
+
+# Vectored frame: four horizontal thrusters at 45 degrees in the corners, two vertical ones front and back
+DEFAULT_ALLOCATION = (
+    # surge sway pitch yaw heave
+    (1, 1, 0, 1, 0),    # front_left
+    (1, -1, 0, -1, 0),  # front_right
+    (1, -1, 0, 1, 0),   # back_left
+    (1, 1, 0, -1, 0),   # back_right
+    (0, 0, 1, 0, 1),    # vertical_front
+    (0, 0, -1, 0, 1),   # vertical_back
+    )
+
+# Per-thruster command as sent in MessageType.THRUSTERS frames: six int16 in [-COMMAND_SCALE, COMMAND_SCALE]
+# followed by the LED/ valve bits
+COMMAND_SCALE = 1000
+THRUSTER_PAYLOAD = struct.Struct("<6hB")
+
+
+def load_allocation(file_path: str) -> np.ndarray:
+    """Reads an allocation matrix from a CSV file, one row per thruster and one column per axis"""
+    allocation = np.loadtxt(file_path, delimiter=",", ndmin=2)
+    if allocation.shape != (len(THRUSTERS), len(AXES)):
+        raise ValueError(f"Allocation matrix must be {len(THRUSTERS)}x{len(AXES)}, got {allocation.shape}")
+    return allocation
+
+
+def response_curve(deadzone: float, expo: float, size: int = 1025) -> np.ndarray:
+    """
+    Lookup table over inputs evenly spaced in [-1, 1]. Inputs within the deadzone map to 0, the rest is
+    rescaled to start at 0 and bent by `expo` (0: linear, 1: cubic) for finer control around the center
+    """
+    x = np.linspace(-1.0, 1.0, size)
+    u = np.clip((np.abs(x) - deadzone) / (1.0 - deadzone), 0.0, 1.0)
+    return np.sign(x) * ((1.0 - expo) * u + expo * u ** 3)
+
+
+class ThrusterMixer:
+    def __init__(self, allocation=DEFAULT_ALLOCATION, deadzone: float = 0.12, expo: float = 0.3,
+                 lut_size: int = 1025):
+        self._allocation = np.asarray(allocation, dtype=np.float64)
+        self._curve = response_curve(deadzone, expo, lut_size)
+        self._half = (lut_size - 1) / 2
+        # Reused on every call, mixing runs once per input event
+        self._index = np.empty(len(AXES), dtype=np.intp)
+        self._shaped = np.empty(len(AXES))
+        self._commands = np.empty(self._allocation.shape[0])
+
+    @property
+    def allocation(self) -> np.ndarray:
+        return self._allocation
+
+    def mix(self, axes) -> np.ndarray:
+        """
+        `axes`: surge, sway, pitch, yaw, heave in [-1, 1].
+        Returns the thruster commands in [-1, 1], the array is reused by the next call
+        """
+        scaled = (np.clip(axes, -1.0, 1.0) + 1.0) * self._half
+        np.rint(scaled, out=scaled)
+        self._index[:] = scaled
+        np.take(self._curve, self._index, out=self._shaped)
+        np.matmul(self._allocation, self._shaped, out=self._commands)
+        peak = np.abs(self._commands).max()
+        if peak > 1.0:
+            self._commands /= peak
+        return self._commands
+
+    @staticmethod
+    def encode(commands: np.ndarray, led_and_valves: int) -> bytes:
+        return THRUSTER_PAYLOAD.pack(*np.rint(commands * COMMAND_SCALE).astype(int), led_and_valves)
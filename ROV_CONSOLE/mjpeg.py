@@ -0,0 +1,217 @@
+"""
+    Low-latency client for MJPEG-over-HTTP streams as served by ustreamer on the Pi.
+    Reads the multipart stream directly instead of through cv2.VideoCapture, whose internal buffering
+    cannot be tuned: only the newest JPEG is kept, older ones are dropped before they are decoded.
+    Decoding runs on a small worker pool, at reduced scale when the display is smaller than the stream.
+"""
+
+import http.client
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Condition, Lock
+from time import perf_counter
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+_READ_TIMEOUT = 0.1
+# Largest factor first, IMREAD_REDUCED_* decodes straight at 1/2, 1/4 or 1/8 of the size
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+    )
+
+
+class MjpegCapture:
+    """cv2.VideoCapture look-alike for multipart/x-mixed-replace JPEG streams"""
+
+    def __init__(self, url: str, decoders: int = 2, timeout: float = 5.0):
+        self._url = urlsplit(url)
+        self._timeout = timeout
+        self._decoders = decoders
+        self._pool = ThreadPoolExecutor(max_workers=decoders, thread_name_prefix="mjpeg-decode")
+        self._connection: http.client.HTTPConnection | None = None
+        # Kept apart from the connection: http.client drops its reference while the response still reads from it
+        self._socket: socket.socket | None = None
+        self._opened = False
+        self._killswitch = False
+
+        self._jpeg_lock = Lock()
+        self._jpeg: bytes | None = None
+        self._jpeg_arrived = 0.0
+        self._jpeg_seq = 0
+        self._claimed_seq = 0
+        self._in_flight = 0
+
+        self._decoded = Condition()
+        self._frame: np.ndarray | None = None
+        self._frame_seq = 0
+        self._frame_timing = (0.0, 0.0)
+        self._read_seq = 0
+        self._read_timing = (0.0, 0.0)
+
+        self._target_size: tuple[int, int] | None = None
+        self._full_size: tuple[int, int] | None = None
+
+        # Connecting blocks for at most `timeout`, VideoStream does it on the capture thread
+        try:
+            response = self._connect()
+        except (OSError, http.client.HTTPException):
+            response = None
+        self._opened = response is not None
+        self._reader_thread = Thread(target=self._reader_loop, args=(response,), daemon=True)
+        self._reader_thread.start()
+
+    @property
+    def target_size(self) -> tuple[int, int] | None:
+        """(width, height) frames are displayed at, decoding is reduced as long as the result stays larger"""
+        return self._target_size
+
+    @target_size.setter
+    def target_size(self, size: tuple[int, int] | None) -> None:
+        self._target_size = size
+
+    @property
+    def frame_timing(self) -> tuple[float, float]:
+        """perf_counter() time the JPEG of the last read() frame arrived and the seconds spent decoding it"""
+        return self._read_timing
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def read(self) -> tuple[bool, np.ndarray | None]:
+        """Returns the newest decoded frame not returned yet"""
+        with self._decoded:
+            if not self._decoded.wait_for(lambda: self._frame_seq > self._read_seq or self._killswitch,
+                                          _READ_TIMEOUT):
+                return False, None
+            if self._killswitch:
+                return False, None
+            self._read_seq = self._frame_seq
+            self._read_timing = self._frame_timing
+            return True, self._frame
+
+    def release(self) -> None:
+        self._killswitch = True
+        self._opened = False
+        if self._socket is not None:
+            # Closing the connection leaves the response's file object open, a reader blocked in
+            # response.read() would sit out the whole timeout; shutting the socket down wakes it
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._connection is not None:
+            self._connection.close()
+        with self._decoded:
+            self._decoded.notify_all()
+        if self._reader_thread.is_alive():
+            self._reader_thread.join()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _imread_flag(self) -> int:
+        if self._target_size is None or self._full_size is None:
+            return cv2.IMREAD_COLOR
+        target_width, target_height = self._target_size
+        full_width, full_height = self._full_size
+        for factor, flag in _REDUCED_FLAGS:
+            if full_width // factor >= target_width and full_height // factor >= target_height:
+                return flag
+        return cv2.IMREAD_COLOR
+
+    def _on_jpeg(self, jpeg: bytes) -> None:
+        arrived = perf_counter()
+        with self._jpeg_lock:
+            self._jpeg = jpeg
+            self._jpeg_arrived = arrived
+            self._jpeg_seq += 1
+            if self._in_flight < self._decoders:
+                self._in_flight += 1
+                self._pool.submit(self._decode_latest)
+
+    def _decode_latest(self) -> None:
+        # Keeps decoding whatever is newest, JPEGs that arrive while all decoders are busy are overwritten
+        while not self._killswitch:
+            with self._jpeg_lock:
+                if self._jpeg_seq == self._claimed_seq:
+                    self._in_flight -= 1
+                    return
+                jpeg, seq, arrived = self._jpeg, self._jpeg_seq, self._jpeg_arrived
+                self._claimed_seq = seq
+            flag = self._imread_flag()
+            decode_start = perf_counter()
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), flag)
+            decode = perf_counter() - decode_start
+            if frame is None:
+                continue
+            factor = next((f for f, fl in _REDUCED_FLAGS if fl == flag), 1)
+            self._full_size = (frame.shape[1] * factor, frame.shape[0] * factor)
+            with self._decoded:
+                # Decoders can finish out of order, never go back to an older frame
+                if seq > self._frame_seq:
+                    self._frame = frame
+                    self._frame_seq = seq
+                    self._frame_timing = (arrived, decode)
+                    self._decoded.notify_all()
+        with self._jpeg_lock:
+            self._in_flight -= 1
+
+    def _connect(self) -> http.client.HTTPResponse:
+        connection_type = http.client.HTTPSConnection if self._url.scheme == "https" else http.client.HTTPConnection
+        self._connection = connection_type(self._url.hostname, self._url.port, timeout=self._timeout)
+        path = self._url.path or "/"
+        if self._url.query:
+            path += "?" + self._url.query
+        self._connection.request("GET", path)
+        self._socket = self._connection.sock
+        response = self._connection.getresponse()
+        if response.status != 200:
+            raise http.client.HTTPException(f"{response.status} {response.reason}")
+        return response
+
+    def _reader_loop(self, response: http.client.HTTPResponse | None) -> None:
+        if response is None:
+            return
+        content_type = response.getheader("Content-Type", "")
+        boundary = content_type.partition("boundary=")[2].strip('"').encode()
+        try:
+            while not self._killswitch:
+                jpeg = self._read_part(response, boundary)
+                if jpeg is None:
+                    break
+                self._on_jpeg(jpeg)
+        except (OSError, http.client.HTTPException, ValueError):
+            pass
+        finally:
+            self._opened = False
+            with self._decoded:
+                self._decoded.notify_all()
+
+    @staticmethod
+    def _read_part(response: http.client.HTTPResponse, boundary: bytes) -> bytes | None:
+        """Reads one part of the multipart body, returns its payload or None at the end of the stream"""
+        line = response.readline()
+        while line and not line.startswith(b"--"):
+            line = response.readline()
+        if not line or (boundary and line.strip() == b"--" + boundary + b"--"):
+            return None
+        length = None
+        line = response.readline()
+        while line.strip():
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+            line = response.readline()
+        if length is not None:
+            return response.read(length)
+        # No Content-Length, collect until the next boundary line
+        chunks = []
+        marker = b"--" + boundary
+        while True:
+            peeked = response.peek(len(marker))[:len(marker)]
+            if not peeked or peeked == marker:
+                break
+            chunks.append(response.readline())
+        return b"".join(chunks).removesuffix(b"\r\n")
@@ -0,0 +1,153 @@
+"""
+Framing for the serial link to the ESP32, shared by the transmit and receive paths.
+
+Frame before stuffing (little endian):
+   version u8 | type u8 | seq u16 | sender time ms u32 | payload | CRC-16/CCITT-FALSE u16
+The CRC covers everything before it. Frames are COBS encoded and wrapped in 0x00 delimiters,
+so a receiver resyncs at the next zero byte and line noise between frames never corrupts a valid one.
+Sequence numbers are shared by all message types of a sender, gaps on the receiving side are lost frames.
+"""
+
+import struct
+from binascii import crc_hqx
+from enum import IntEnum
+from functools import reduce
+from time import perf_counter
+from typing import NamedTuple
+
+VERSION = 1
+DELIMITER = b"\x00"
+
+_HEADER = struct.Struct("<BBHI")
+_CRC = struct.Struct("<H")
+_MIN_FRAME = _HEADER.size + _CRC.size
+# Longest undelimited run kept while waiting for a delimiter, anything longer is noise
+_MAX_PENDING = 4096
+
+
+class MessageType(IntEnum):
+    CONTROL = 1    # GUI -> ESP32: thruster magnitudes, sign bits, LED/ valve bits
+    TELEMETRY = 2  # ESP32 -> GUI: depth, yaw, pitch, roll
+    PING = 3       # Either way, echoed back as PONG with the same payload
+    PONG = 4
+    LOG = 5        # ESP32 -> GUI: free-form text
+    THRUSTERS = 6  # GUI -> ESP32: mixed per-thruster commands and LED/ valve bits, replaces CONTROL (mixing.py)
+
+
+class Frame(NamedTuple):
+    version: int
+    kind: int
+    seq: int
+    timestamp_ms: int  # Sender's clock
+    payload: bytes
+    received_at: float  # perf_counter() on the receiving side
+
+
+def crc16(data: bytes, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), table driven in binascii's C implementation"""
+    return crc_hqx(data, crc)
+
+
+def cobs_encode(data: bytes) -> bytes:
+    out = bytearray()
+    # Each zero-free run becomes a length code plus its bytes, runs longer than 254 are split
+    for block in data.split(DELIMITER):
+        while len(block) >= 0xFE:
+            out.append(0xFF)
+            out += block[:0xFE]
+            block = block[0xFE:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def cobs_decode(data: bytes) -> bytes:
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        code = data[i]
+        end = i + code
+        if code == 0 or end > n:
+            raise ValueError("Malformed COBS block")
+        out += data[i + 1:end]
+        i = end
+        if code != 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+def legacy_control_packet(payload: bytes) -> bytes:
+    """The pre-framing 9-byte control packet: 7 payload bytes, XOR of them and a 255 terminator"""
+    return payload + bytes([reduce(lambda x, y: x ^ y, payload, 0), 255])
+
+
+class FrameEncoder:
+    def __init__(self):
+        self._seq = 0
+        self._epoch = perf_counter()
+
+    @property
+    def seq(self) -> int:
+        """Sequence number the next frame will carry"""
+        return self._seq
+
+    def now_ms(self) -> int:
+        return int((perf_counter() - self._epoch) * 1000) & 0xFFFFFFFF
+
+    def encode(self, kind: int, payload: bytes = b"") -> bytes:
+        """Returns the stuffed frame including its delimiters"""
+        body = _HEADER.pack(VERSION, kind, self._seq, self.now_ms()) + payload
+        self._seq = (self._seq + 1) & 0xFFFF
+        return DELIMITER + cobs_encode(body + _CRC.pack(crc16(body))) + DELIMITER
+
+    def encode_many(self, messages: list[tuple[int, bytes]]) -> bytes:
+        return b"".join(self.encode(kind, payload) for kind, payload in messages)
+
+
+class FrameDecoder:
+    """Incremental decoder, feed it raw bytes as they come off the port"""
+
+    def __init__(self):
+        self._buffer = b""
+        self._last_seq: int | None = None
+        self.received = 0
+        self.lost = 0  # Inferred from sequence gaps
+        self.errors = 0  # Bad stuffing, CRC or version
+
+    def feed(self, data: bytes, received_at: float | None = None) -> list[Frame]:
+        received_at = perf_counter() if received_at is None else received_at
+        *chunks, self._buffer = (self._buffer + data).split(DELIMITER)
+        if len(self._buffer) > _MAX_PENDING:
+            self._buffer = b""
+            self.errors += 1
+        frames = []
+        for chunk in chunks:
+            if not chunk:
+                continue
+            frame = self._decode(chunk, received_at)
+            if frame is not None:
+                frames.append(frame)
+        return frames
+
+    def _decode(self, chunk: bytes, received_at: float) -> Frame | None:
+        try:
+            raw = cobs_decode(chunk)
+        except ValueError:
+            self.errors += 1
+            return None
+        if len(raw) < _MIN_FRAME or crc16(raw[:-_CRC.size]) != _CRC.unpack_from(raw, len(raw) - _CRC.size)[0]:
+            self.errors += 1
+            return None
+        version, kind, seq, timestamp_ms = _HEADER.unpack_from(raw)
+        if version != VERSION:
+            self.errors += 1
+            return None
+        if self._last_seq is not None:
+            gap = (seq - self._last_seq) & 0xFFFF
+            # A large jump backwards means the sender restarted, not 65k lost frames
+            if 0 < gap < 0x8000:
+                self.lost += gap - 1
+        self._last_seq = seq
+        self.received += 1
+        return Frame(version, kind, seq, timestamp_ms, raw[_HEADER.size:-_CRC.size], received_at)
@@ -0,0 +1,162 @@
+"""
+    Background recording of a camera into rotating video segments.
+    Frames are handed over through a bounded queue, when the encoder falls behind new frames are dropped
+    instead of blocking the capture thread. Each segment gets a CSV sidecar with the capture time of every frame.
+    Stopping returns right away, frames still queued are encoded in the background.
+"""
+
+import csv
+import os
+from datetime import datetime
+from queue import Queue, Full, Empty
+from threading import Thread
+from time import perf_counter, time
+
+import cv2
+import numpy as np
+
+# How often the idle encoder checks whether it was stopped
+_POLL_INTERVAL = 0.1
+
+
+class SegmentRecorder:
+    """
+    Encodes submitted frames on a background thread, starting a new segment every `segment_seconds`.
+    `fps` is the playback rate written to the first segment, later ones use the rate measured over the previous one
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            name: str,
+            fps: float = 30.0,
+            segment_seconds: float = 60.0,
+            queue_size: int = 64,
+            fourcc: str = "MJPG",
+            ):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._name = name
+        self._fps = fps
+        self._segment_seconds = segment_seconds
+        self._fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self._queue: Queue[tuple[np.ndarray, float]] = Queue(maxsize=queue_size)
+        # perf_counter() timestamps are converted to wall-clock time for the index
+        self._wall_offset = time() - perf_counter()
+        self._encoded = 0
+        self._dropped = 0
+        self._segments: list[str] = []
+        self._writer: cv2.VideoWriter | None = None
+        self._index_file = None
+        self._index: csv.writer | None = None
+        self._segment_start = 0.0
+        self._segment_end = 0.0
+        self._segment_frames = 0
+        self._frame_size: tuple[int, int] | None = None
+        self._running = True
+        self._encoder_thread = Thread(target=self._encoder_loop, daemon=True)
+        self._encoder_thread.start()
+
+    @property
+    def encoded(self) -> int:
+        return self._encoded
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def segments(self) -> list[str]:
+        return list(self._segments)
+
+    @property
+    def running(self) -> bool:
+        """False once stopped, even while the backlog is still being encoded"""
+        return self._running
+
+    @property
+    def finishing(self) -> bool:
+        """Stopped but still encoding the frames queued before"""
+        return not self._running and self._encoder_thread.is_alive()
+
+    @property
+    def fps(self) -> float:
+        """Playback rate of the current segment"""
+        return self._fps
+
+    def submit(self, frame: np.ndarray, timestamp: float, copy: bool = False) -> bool:
+        """Queues `frame` for encoding, returns False if it had to be dropped. Never blocks"""
+        if not self._running:
+            return False
+        if self._queue.full():
+            self._dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((frame.copy() if copy else frame, timestamp))
+        except Full:
+            self._dropped += 1
+            return False
+        return True
+
+    def stop(self) -> None:
+        """Stops taking frames, never blocks: the encoder finishes what is queued and closes the segment on its own"""
+        self._running = False
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until the backlog is encoded after stop(), returns False on timeout"""
+        self._encoder_thread.join(timeout)
+        return not self._encoder_thread.is_alive()
+
+    def _open_segment(self, timestamp: float, width: int, height: int) -> None:
+        if self._segment_frames > 1 and self._segment_end > self._segment_start:
+            # Plays back at the speed it was captured at, whatever the camera actually delivered
+            self._fps = (self._segment_frames - 1) / (self._segment_end - self._segment_start)
+        self._close_segment()
+        stamp = datetime.fromtimestamp(timestamp + self._wall_offset).strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self._directory, f"{self._name}_{stamp}_{len(self._segments):04d}")
+        # A recorder stopped just before may still be finishing a segment of the same name
+        while os.path.exists(base + ".avi"):
+            base += "_"
+        self._writer = cv2.VideoWriter(base + ".avi", self._fourcc, self._fps, (width, height))
+        self._index_file = open(base + ".csv", "w", newline="")
+        self._index = csv.writer(self._index_file)
+        self._index.writerow(["frame", "wall_time", "capture_perf_counter"])
+        self._segments.append(base + ".avi")
+        self._segment_start = timestamp
+        self._segment_frames = 0
+        self._frame_size = (width, height)
+
+    def _close_segment(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+            self._index = None
+
+    def _encoder_loop(self) -> None:
+        try:
+            while True:
+                try:
+                    frame, timestamp = self._queue.get(timeout=_POLL_INTERVAL)
+                except Empty:
+                    if not self._running:
+                        break
+                    continue
+                height, width = frame.shape[:2]
+                if (self._writer is None or (width, height) != self._frame_size
+                        or timestamp - self._segment_start >= self._segment_seconds):
+                    self._open_segment(timestamp, width, height)
+                self._writer.write(frame)
+                self._index.writerow([self._segment_frames, f"{timestamp + self._wall_offset:.6f}", f"{timestamp:.6f}"])
+                self._segment_frames += 1
+                self._segment_end = timestamp
+                self._encoded += 1
+        finally:
+            self._running = False
+            self._close_segment()
@@ -0,0 +1,89 @@
+"""
+    Fixed-rate scheduling on absolute monotonic deadlines.
+    The next deadline is derived from the previous deadline rather than from when the work finished,
+    so the period doesn't drift with the loop's own work time or GIL contention, it only jitters.
+"""
+
+import time
+
+from .stats import RollingStats
+
+
+class DeadlineScheduler:
+    """Tells a loop when its next tick is due and measures how well it kept to the cadence"""
+
+    def __init__(self, rate: float, window: int = 500):
+        self._period = 1 / rate
+        self._next = time.monotonic() + self._period
+        self._last_tick: float | None = None
+        self._periods = RollingStats(window)
+        self._lateness = RollingStats(window)
+        self._missed = 0
+
+    @property
+    def rate(self) -> float:
+        return 1 / self._period
+
+    @rate.setter
+    def rate(self, rate: float) -> None:
+        self._period = 1 / rate
+        self._next = time.monotonic() + self._period
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    @property
+    def periods(self) -> RollingStats:
+        """Measured seconds between consecutive ticks"""
+        return self._periods
+
+    @property
+    def lateness(self) -> RollingStats:
+        """Seconds each tick ran after its deadline"""
+        return self._lateness
+
+    @property
+    def missed(self) -> int:
+        """Deadlines skipped because the loop was more than a whole period late"""
+        return self._missed
+
+    def time_until_next(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        return self._next - now
+
+    def due(self, now: float | None = None) -> bool:
+        return self.time_until_next(now) <= 0
+
+    def tick(self, now: float | None = None) -> None:
+        """Marks the current deadline as served and advances to the next one"""
+        now = time.monotonic() if now is None else now
+        self._lateness.add(now - self._next)
+        if self._last_tick is not None:
+            self._periods.add(now - self._last_tick)
+        self._last_tick = now
+        self._next += self._period
+        if now >= self._next:
+            # Catching up with a burst of ticks would only make the cadence worse, skip the lost ones
+            skipped = int((now - self._next) // self._period) + 1
+            self._missed += skipped
+            self._next += skipped * self._period
+
+    def restart(self, now: float | None = None) -> None:
+        """Starts the period over at `now`, for work done early: the next tick is a full period later"""
+        now = time.monotonic() if now is None else now
+        self._last_tick = now
+        self._next = now + self._period
+
+    def sleep_until_next(self) -> None:
+        remaining = self.time_until_next()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def summary(self) -> str:
+        if not self._periods.count:
+            return f"{self.rate:.0f} Hz --"
+        p50, _, p99 = self._periods.percentiles()
+        late50, _, late99 = self._lateness.percentiles()
+        return (f"{self.rate:.0f} Hz  period {p50 * 1e3:.1f}/{p99 * 1e3:.1f} ms  "
+                f"jitter {late50 * 1e3:.2f}/{late99 * 1e3:.2f} ms  missed {self._missed}")
@@ -0,0 +1,165 @@
+"""
+    Camera capture in a dedicated worker process.
+    The worker decodes frames with opencv and writes them into a shared memory triple buffer,
+    the GUI process reads the latest complete frame as a numpy view without copying it.
+
+    Layout of the shared block: an int64 header followed by three frame slots of `max_size` bytes.
+    The writer never touches the latest slot nor the slot the reader has claimed, each slot carries a
+    seqlock counter (odd while being written) so a claimed slot is only used once its write completed.
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from time import sleep
+
+import cv2
+import numpy as np
+
+from .video_sources import open_capture, timed_read, OPEN_TIMEOUT
+
+# Header fields
+_H_OPEN = 0      # 1 while the worker's source is open
+_H_FRAMES = 1    # Number of frames written so far
+_H_LATEST = 2    # Slot holding the latest complete frame, -1 before the first frame
+_H_READING = 3   # Slot claimed by the reader, the writer skips it
+_H_SEQ = 4       # Seqlock counters, one per slot
+_H_SHAPE = 7     # (height, width) per slot
+_H_ARRIVED = 13  # perf_counter() (ns) the frame in each slot arrived at the worker, the clock is system-wide
+_H_DECODE = 16   # Nanoseconds the worker spent decoding the frame in each slot
+_HEADER_FIELDS = 24
+_SLOTS = 3
+
+# How long read() waits for the worker before reporting a failed read
+_READ_TIMEOUT = 0.1
+_IDLE_INTERVAL = 0.1
+# Starting an interpreter and importing opencv in the worker
+_SPAWN_TIMEOUT = 10.0
+
+
+def _map(buf, max_width: int, max_height: int) -> tuple[np.ndarray, list[np.ndarray]]:
+    header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=buf)
+    slot_size = max_width * max_height * 3
+    offset = header.nbytes
+    slots = [np.ndarray((slot_size,), dtype=np.uint8, buffer=buf, offset=offset + i * slot_size)
+             for i in range(_SLOTS)]
+    return header, slots
+
+
+def _capture_worker(descriptor, shm_name: str, max_width: int, max_height: int, new_frame, ready, stop) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    header, slots = _map(shm.buf, max_width, max_height)
+    source = open_capture(descriptor)
+    try:
+        header[_H_OPEN] = int(source.isOpened())
+        ready.set()
+        while not stop.is_set():
+            if not source.isOpened():
+                header[_H_OPEN] = 0
+                stop.wait(_IDLE_INTERVAL)
+                continue
+            ok, frame, arrived, decode = timed_read(source)
+            if not ok:
+                stop.wait(_IDLE_INTERVAL)
+                continue
+            height, width = frame.shape[:2]
+            if width > max_width or height > max_height:
+                scale = min(max_width / width, max_height / height)
+                width, height = int(width * scale), int(height * scale)
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            latest, reading = header[_H_LATEST], header[_H_READING]
+            slot = next(i for i in range(_SLOTS) if i != latest and i != reading)
+            header[_H_SEQ + slot] += 1
+            view = slots[slot][:height * width * 3].reshape(height, width, 3)
+            np.copyto(view, frame)
+            header[_H_SHAPE + 2 * slot] = height
+            header[_H_SHAPE + 2 * slot + 1] = width
+            header[_H_ARRIVED + slot] = int(arrived * 1e9)
+            header[_H_DECODE + slot] = int(decode * 1e9)
+            header[_H_SEQ + slot] += 1
+            header[_H_LATEST] = slot
+            header[_H_FRAMES] += 1
+            header[_H_OPEN] = 1
+            new_frame.set()
+    finally:
+        header[_H_OPEN] = 0
+        source.release()
+        del header, slots
+        shm.close()
+
+
+class SharedMemoryCapture:
+    """cv2.VideoCapture look-alike for frames decoded by a worker process"""
+
+    def __init__(self, descriptor: int | str | None, max_size: tuple[int, int] = (1920, 1080)):
+        max_width, max_height = max_size
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=_HEADER_FIELDS * 8 + _SLOTS * max_width * max_height * 3
+            )
+        self._header, self._slots = _map(self._shm.buf, max_width, max_height)
+        self._header[:] = 0
+        self._header[_H_LATEST] = -1
+        self._header[_H_READING] = -1
+        self._frames_read = 0
+        self._frame_timing = (0.0, 0.0)
+        # Spawn rather than fork, forking a process that already runs Qt and capture threads is unsafe
+        ctx = mp.get_context("spawn")
+        self._new_frame = ctx.Event()
+        self._stop = ctx.Event()
+        ready = ctx.Event()
+        self._process = ctx.Process(
+            target=_capture_worker,
+            args=(descriptor, self._shm.name, max_width, max_height, self._new_frame, ready, self._stop),
+            daemon=True,
+            )
+        self._process.start()
+        # Like cv2.VideoCapture.open, return once the worker knows whether the source opened
+        ready.wait(_SPAWN_TIMEOUT + OPEN_TIMEOUT)
+
+    @property
+    def frame_timing(self) -> tuple[float, float]:
+        """perf_counter() time the last read() frame arrived at the worker and the seconds it spent decoding it"""
+        return self._frame_timing
+
+    def isOpened(self) -> bool:
+        return self._process.is_alive() and bool(self._header[_H_OPEN])
+
+    def read(self) -> tuple[bool, np.ndarray | None]:
+        """Returns a view of the newest frame not read yet, valid until the next read()"""
+        header = self._header
+        while True:
+            if header[_H_FRAMES] == self._frames_read:
+                # Clear before re-checking so a frame landing in between is not missed
+                self._new_frame.clear()
+                if header[_H_FRAMES] == self._frames_read:
+                    if not self._new_frame.wait(_READ_TIMEOUT):
+                        return False, None
+                    continue
+            frames = int(header[_H_FRAMES])
+            slot = int(header[_H_LATEST])
+            header[_H_READING] = slot
+            if header[_H_LATEST] != slot or header[_H_SEQ + slot] & 1:
+                # The writer moved on while the slot was being claimed
+                sleep(0)
+                continue
+            height = int(header[_H_SHAPE + 2 * slot])
+            width = int(header[_H_SHAPE + 2 * slot + 1])
+            self._frames_read = frames
+            self._frame_timing = (header[_H_ARRIVED + slot] / 1e9, header[_H_DECODE + slot] / 1e9)
+            return True, self._slots[slot][:height * width * 3].reshape(height, width, 3)
+
+    def release(self) -> None:
+        if self._shm is None:
+            return
+        self._stop.set()
+        self._process.join(timeout=2)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        del self._header, self._slots
+        try:
+            self._shm.close()
+        except BufferError:
+            # A caller still holds a frame view, the mapping goes away with it
+            pass
+        self._shm.unlink()
+        self._shm = None
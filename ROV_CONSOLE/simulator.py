@@ -0,0 +1,333 @@
+"""
+    Stand-in for the ESP32 for testing the console without hardware.
+
+    Serves the serial protocol on a pseudo-terminal (POSIX) or a TCP port. Connect the console to the
+    printed pty path, or to socket://localhost:PORT when serving on TCP (ESP32.connect accepts pySerial URLs).
+    The simulator:
+       - decodes CONTROL and THRUSTERS frames, or bare 9-byte control packets with --legacy
+       - answers PING frames with PONG, carrying the same payload
+       - drives a simple vehicle model: thrust follows the commands with a first-order lag, depth,
+         yaw and pitch integrate it; commands older than a second count as zero like on the firmware
+       - sends TELEMETRY at --rate Hz (10 Hz up to several kHz, high rates are sent in batches)
+       - optionally adds sensor noise, corrupts frames and drops the connection at intervals
+
+    Usage: python -m ROV_CONSOLE.simulator [--tcp PORT] [--rate HZ] [--noise STD] [--corrupt P]
+                                          [--disconnect-every S --disconnect-for S] [--legacy]
+"""
+
+import argparse
+import os
+import random
+import select
+import socket
+import struct
+import sys
+import time
+from functools import reduce
+
+import numpy as np
+
+from .mixing import DEFAULT_ALLOCATION, THRUSTER_PAYLOAD, COMMAND_SCALE
+from .protocol import FrameDecoder, FrameEncoder, MessageType
+from .scheduling import DeadlineScheduler
+from .telemetry import PAYLOAD
+
+_CONTROL = struct.Struct("7B")
+# Telemetry is sent in batches above this rate, sleeping per sample isn't precise enough
+_MAX_TICK_RATE = 500.0
+_COMMAND_TIMEOUT = 1.0
+
+
+class PtyTransport:
+    """Serves on a pseudo-terminal, the console opens `name` like a serial port"""
+
+    def __init__(self):
+        import tty
+        self._master, self._slave = os.openpty()
+        # Raw mode: no echo, no line discipline mangling binary frames
+        tty.setraw(self._slave)
+        self.name = os.ttyname(self._slave)
+        self._online = True
+
+    @property
+    def connected(self) -> bool:
+        return self._online
+
+    def read(self, timeout: float) -> bytes:
+        readable, _, _ = select.select([self._master], [], [], max(0.0, timeout))
+        if not readable:
+            return b""
+        data = os.read(self._master, 4096)
+        return data if self._online else b""
+
+    def write(self, data: bytes) -> None:
+        if self._online:
+            os.write(self._master, data)
+
+    def drop(self) -> None:
+        # A pty can't be unplugged, the device goes silent and deaf instead
+        self._online = False
+
+    def restore(self) -> None:
+        self._online = True
+
+    def close(self) -> None:
+        os.close(self._master)
+        os.close(self._slave)
+
+
+class TcpTransport:
+    """Serves one client at a time on a TCP port (pySerial socket:// URL)"""
+
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        self._server = socket.create_server((host, port))
+        self._server.setblocking(False)
+        self._client: socket.socket | None = None
+        self._online = True
+        self.name = f"socket://{host}:{port}"
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    def read(self, timeout: float) -> bytes:
+        sockets = [self._client] if self._client is not None else ([self._server] if self._online else [])
+        if not sockets:
+            time.sleep(max(0.0, timeout))
+            return b""
+        readable, _, _ = select.select(sockets, [], [], max(0.0, timeout))
+        if not readable:
+            return b""
+        if self._client is None:
+            self._client, _ = self._server.accept()
+            self._client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return b""
+        try:
+            data = self._client.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self._close_client()
+        return data
+
+    def write(self, data: bytes) -> None:
+        if self._client is None:
+            return
+        try:
+            self._client.sendall(data)
+        except OSError:
+            self._close_client()
+
+    def drop(self) -> None:
+        # Refuses new clients until restored, like an unplugged device
+        self._online = False
+        self._close_client()
+
+    def restore(self) -> None:
+        self._online = True
+
+    def _close_client(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def close(self) -> None:
+        self._close_client()
+        self._server.close()
+
+
+class LegacyDecoder:
+    """Bare 9-byte control packets: 7 payload bytes, their XOR and a 255 terminator"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.received = 0
+        self.errors = 0
+
+    def feed(self, data: bytes) -> list[bytes]:
+        self._buffer += data
+        payloads = []
+        while (end := self._buffer.find(255)) >= 0:
+            packet = bytes(self._buffer[:end + 1])
+            del self._buffer[:end + 1]
+            payload, check = packet[-9:-2], packet[-2:-1]
+            if len(packet) >= 9 and check[0] == reduce(lambda x, y: x ^ y, payload, 0):
+                payloads.append(payload)
+                self.received += 1
+            else:
+                self.errors += 1
+        return payloads
+
+
+class VehicleModel:
+    """Thrust per axis (surge, sway, pitch, yaw, heave) lags the commands, the pose integrates the thrust"""
+
+    def __init__(self, time_constant: float = 0.15, max_heave_speed: float = 0.5,
+                 max_yaw_rate: float = 90.0, max_pitch: float = 30.0):
+        self._time_constant = time_constant
+        self._max_heave_speed = max_heave_speed
+        self._max_yaw_rate = max_yaw_rate
+        self._max_pitch = max_pitch
+        self._allocation_pinv = np.linalg.pinv(np.asarray(DEFAULT_ALLOCATION, dtype=np.float64))
+        self.command = np.zeros(5)
+        self.thrust = np.zeros(5)
+        self.commanded_at = 0.0
+        self.depth = 1.0
+        self.yaw = 0.0
+        self.pitch = 0.0
+        self.roll = 0.0
+        self._t = 0.0
+
+    def on_control(self, payload: bytes, now: float) -> None:
+        *magnitudes, signs, _ = _CONTROL.unpack(payload)
+        self.command = np.array([(-m if signs & (1 << i) else m) / 254 for i, m in enumerate(magnitudes)])
+        self.commanded_at = now
+
+    def on_thrusters(self, payload: bytes, now: float) -> None:
+        *commands, _ = THRUSTER_PAYLOAD.unpack(payload)
+        # Back from thruster commands to axes through the default allocation
+        self.command = np.clip(self._allocation_pinv @ (np.array(commands) / COMMAND_SCALE), -1.0, 1.0)
+        self.commanded_at = now
+
+    def step(self, dt: float, now: float) -> None:
+        command = self.command if now - self.commanded_at < _COMMAND_TIMEOUT else np.zeros(5)
+        self.thrust += (command - self.thrust) * min(1.0, dt / self._time_constant)
+        surge, sway, pitch, yaw, heave = self.thrust
+        self.depth = max(0.0, self.depth - heave * self._max_heave_speed * dt)
+        self.yaw = (self.yaw + yaw * self._max_yaw_rate * dt + 180.0) % 360.0 - 180.0
+        # Pitch settles at an angle proportional to the pitch thrust, righted by buoyancy otherwise
+        self.pitch += (pitch * self._max_pitch - self.pitch) * min(1.0, dt / 0.5)
+        self._t += dt
+        self.roll = 2.0 * np.sin(self._t * 0.7) + 5.0 * sway
+
+
+class Simulator:
+    def __init__(self, transport, rate: float = 50.0, noise: float = 0.0, corrupt: float = 0.0,
+                 disconnect_every: float = 0.0, disconnect_for: float = 1.0, legacy: bool = False,
+                 seed: int | None = None):
+        self._transport = transport
+        self._rate = rate
+        self._noise = noise
+        self._corrupt = corrupt
+        self._disconnect_every = disconnect_every
+        self._disconnect_for = disconnect_for
+        self._legacy = legacy
+        self._random = random.Random(seed)
+        self._numpy_random = np.random.default_rng(seed)
+        self._encoder = FrameEncoder()
+        self._decoder = FrameDecoder()
+        self._legacy_decoder = LegacyDecoder()
+        self._model = VehicleModel()
+        self._scheduler = DeadlineScheduler(min(rate, _MAX_TICK_RATE))
+        self._killswitch = False
+        self.controls = 0
+        self.pings = 0
+        self.sent = 0
+        self.corrupted = 0
+        self.disconnects = 0
+
+    @property
+    def model(self) -> VehicleModel:
+        return self._model
+
+    def _on_data(self, data: bytes, now: float) -> None:
+        if self._legacy:
+            for payload in self._legacy_decoder.feed(data):
+                self._model.on_control(payload, now)
+                self.controls += 1
+            return
+        for frame in self._decoder.feed(data):
+            if frame.kind == MessageType.CONTROL and len(frame.payload) == _CONTROL.size:
+                self._model.on_control(frame.payload, now)
+                self.controls += 1
+            elif frame.kind == MessageType.THRUSTERS and len(frame.payload) == THRUSTER_PAYLOAD.size:
+                self._model.on_thrusters(frame.payload, now)
+                self.controls += 1
+            elif frame.kind == MessageType.PING:
+                self._transport.write(self._encoder.encode(MessageType.PONG, frame.payload))
+                self.pings += 1
+
+    def _telemetry_frame(self) -> bytes:
+        model = self._model
+        values = np.array([model.depth, model.yaw, model.pitch, model.roll])
+        if self._noise:
+            values += self._numpy_random.normal(0.0, self._noise, 4)
+        frame = bytearray(self._encoder.encode(MessageType.TELEMETRY, PAYLOAD.pack(*values)))
+        if self._corrupt and self._random.random() < self._corrupt:
+            # Anywhere inside the frame, delimiters included, the receiver has to resync either way
+            frame[self._random.randrange(len(frame))] ^= 1 << self._random.randrange(8)
+            self.corrupted += 1
+        return bytes(frame)
+
+    def run(self, duration: float | None = None) -> None:
+        start = last = time.monotonic()
+        pending = 0.0
+        next_drop = start + self._disconnect_every if self._disconnect_every else None
+        restore_at = None
+        while not self._killswitch:
+            data = self._transport.read(self._scheduler.time_until_next())
+            now = time.monotonic()
+            if duration is not None and now - start >= duration:
+                break
+            if data:
+                self._on_data(data, now)
+            if next_drop is not None and now >= next_drop:
+                self._transport.drop()
+                self.disconnects += 1
+                restore_at = now + self._disconnect_for
+                next_drop = now + self._disconnect_every
+            if restore_at is not None and now >= restore_at:
+                self._transport.restore()
+                restore_at = None
+            if not self._scheduler.due(now):
+                continue
+            self._scheduler.tick(now)
+            self._model.step(now - last, now)
+            # Samples owed since the last tick, the fraction carries over so the average rate is exact
+            pending += (now - last) * self._rate
+            last = now
+            count = int(pending)
+            pending -= count
+            if count and self._transport.connected:
+                self._transport.write(b"".join(self._telemetry_frame() for _ in range(count)))
+                self.sent += count
+
+    def kill(self) -> None:
+        self._killswitch = True
+
+    def summary(self) -> str:
+        return (f"controls {self.controls}  pings {self.pings}  telemetry {self.sent}  "
+                f"corrupted {self.corrupted}  disconnects {self.disconnects}  "
+                f"frame errors {self._decoder.errors + self._legacy_decoder.errors}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="ESP32 simulator for the ROV console")
+    parser.add_argument("--tcp", type=int, help="serve on this TCP port instead of a pty")
+    parser.add_argument("--rate", type=float, default=50.0, help="telemetry rate in Hz")
+    parser.add_argument("--noise", type=float, default=0.0, help="sensor noise standard deviation")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="probability a telemetry frame is corrupted")
+    parser.add_argument("--disconnect-every", type=float, default=0.0, help="drop the connection every S seconds")
+    parser.add_argument("--disconnect-for", type=float, default=1.0, help="seconds each drop lasts")
+    parser.add_argument("--legacy", action="store_true", help="expect bare 9-byte control packets")
+    parser.add_argument("--duration", type=float, help="exit after S seconds")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    if args.tcp is None and sys.platform == "win32":
+        parser.error("pseudo-terminals aren't available on Windows, use --tcp")
+    transport = TcpTransport(args.tcp) if args.tcp is not None else PtyTransport()
+    print(f"Simulated ESP32 on {transport.name}", flush=True)
+    simulator = Simulator(transport, args.rate, args.noise, args.corrupt, args.disconnect_every,
+                          args.disconnect_for, args.legacy, args.seed)
+    try:
+        simulator.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transport.close()
+        print(simulator.summary())
+
+
+if __name__ == "__main__":
+    main()
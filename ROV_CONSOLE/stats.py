@@ -0,0 +1,60 @@
+"""
+    Rolling sample windows shared by the video, serial link and scheduling instrumentation.
+"""
+
+from collections.abc import Iterable
+from time import perf_counter
+
+import numpy as np
+
+
+class RollingStats:
+    """Fixed-size window of the most recent samples"""
+
+    def __init__(self, size: int = 300):
+        self._samples = np.zeros(size, dtype=np.float64)
+        self._index = 0
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def add(self, value: float) -> None:
+        self._samples[self._index] = value
+        self._index = (self._index + 1) % self._samples.size
+        self._count = min(self._count + 1, self._samples.size)
+
+    def values(self) -> np.ndarray:
+        return self._samples[:self._count].copy()
+
+    def mean(self) -> float:
+        return float(self.values().mean()) if self._count else 0.0
+
+    def percentiles(self, q: Iterable[float] = (50, 95, 99)) -> tuple[float, ...]:
+        q = tuple(q)
+        if not self._count:
+            return (0.0,) * len(q)
+        return tuple(float(p) for p in np.percentile(self.values(), q))
+
+
+class RateMeter:
+    """Events per second over the last `size` events"""
+
+    def __init__(self, size: int = 60):
+        self._ticks = RollingStats(size)
+        self._last: float | None = None
+
+    def tick(self, now: float | None = None) -> None:
+        now = perf_counter() if now is None else now
+        if self._last is not None:
+            self._ticks.add(now - self._last)
+        self._last = now
+
+    @property
+    def rate(self) -> float:
+        interval = self._ticks.mean()
+        if interval <= 0 or self._last is None or perf_counter() - self._last > 1:
+            # Nothing arrived for a second, the window no longer describes the stream
+            return 0.0
+        return 1 / interval
@@ -0,0 +1,93 @@
+"""
+    Telemetry sent by the ESP32: sample decoding, latest-state holder and a time-series ring buffer.
+    Samples arrive as TELEMETRY frames (see protocol.py) whose payload is
+       float32 depth (m) | float32 yaw | float32 pitch | float32 roll (deg), little endian
+"""
+
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+from .protocol import Frame
+
+PAYLOAD = struct.Struct("<ffff")
+
+
+class TelemetrySample(NamedTuple):
+    timestamp: float  # perf_counter() at reception
+    device_ms: int
+    depth: float
+    yaw: float
+    pitch: float
+    roll: float
+
+
+class TelemetryHistory:
+    """Preallocated ring of the last `size` samples, columns: timestamp, depth, yaw, pitch, roll"""
+
+    COLUMNS = ("timestamp", "depth", "yaw", "pitch", "roll")
+
+    def __init__(self, size: int = 4096):
+        self._data = np.zeros((size, len(self.COLUMNS)), dtype=np.float64)
+        self._index = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, sample: TelemetrySample) -> None:
+        row = self._data[self._index]
+        row[0] = sample.timestamp
+        row[1] = sample.depth
+        row[2] = sample.yaw
+        row[3] = sample.pitch
+        row[4] = sample.roll
+        self._index = (self._index + 1) % self._data.shape[0]
+        self._count = min(self._count + 1, self._data.shape[0])
+
+    def series(self, seconds: float | None = None) -> np.ndarray:
+        """Copy of the stored samples in chronological order, optionally only the last `seconds`"""
+        size = self._data.shape[0]
+        order = (self._index - self._count + np.arange(self._count)) % size
+        data = self._data[order]
+        if seconds is not None and self._count:
+            data = data[data[:, 0] >= data[-1, 0] - seconds]
+        return data
+
+
+class Telemetry:
+    """Latest telemetry state plus history, written by the serial reader thread"""
+
+    def __init__(self, history_size: int = 4096):
+        # Replaced as a whole on every sample, readers never see a half-updated state and need no lock
+        self._latest: TelemetrySample | None = None
+        self._history = TelemetryHistory(history_size)
+        self._received = 0
+        self._errors = 0
+
+    @property
+    def latest(self) -> TelemetrySample | None:
+        return self._latest
+
+    @property
+    def history(self) -> TelemetryHistory:
+        return self._history
+
+    @property
+    def received(self) -> int:
+        return self._received
+
+    @property
+    def errors(self) -> int:
+        """Frames with a payload of the wrong size"""
+        return self._errors
+
+    def on_frame(self, frame: Frame) -> None:
+        if len(frame.payload) != PAYLOAD.size:
+            self._errors += 1
+            return
+        sample = TelemetrySample(frame.received_at, frame.timestamp_ms, *PAYLOAD.unpack(frame.payload))
+        self._history.append(sample)
+        self._latest = sample
+        self._received += 1
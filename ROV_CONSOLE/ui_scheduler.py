@@ -0,0 +1,148 @@
+"""
+    Runs the periodic GUI-thread work of the console from one timer, each task at its own rate and priority.
+    Every tick runs the due tasks highest priority first; once the tick's time budget is spent, the
+    remaining LOW priority tasks are deferred to a later tick instead of delaying the event loop, so the
+    camera frames (delivered by signals) and control feedback keep their cadence while cheap-to-postpone
+    UI work waits. Ticks that go over budget are counted and reported with the slowest task.
+    The timer is single-shot, armed for the next deadline, so the GUI thread only wakes when something is due.
+"""
+
+import math
+import time
+from collections.abc import Callable
+from enum import IntEnum
+from time import perf_counter
+
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+
+from .scheduling import DeadlineScheduler
+from .stats import RollingStats
+
+
+class Priority(IntEnum):
+    HIGH = 0    # Runs whenever due, budget or not
+    NORMAL = 1  # Runs whenever due, counts against the budget
+    LOW = 2     # Deferred while the tick is over budget
+
+
+class _Task:
+    def __init__(self, name: str, callback: Callable[[], None], rate: float, priority: Priority):
+        self.name = name
+        self.callback = callback
+        self.priority = priority
+        self.schedule = DeadlineScheduler(rate)
+        self.run_time = RollingStats(200)
+        self.deferred = 0
+
+
+class UiScheduler(QObject):
+    # Task name and seconds the tick took, emitted on the GUI thread when a tick goes over budget
+    overrun = Signal(str, float)
+
+    def __init__(self, parent: QObject | None = None, budget: float = 0.008):
+        super().__init__(parent)
+        self._tasks: dict[str, _Task] = {}
+        self._order: list[_Task] = []
+        self._budget = budget
+        self._overruns = 0
+        self._tick_time = RollingStats(500)
+        self._running = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        # The default coarse timer may fire up to 5% late, too much for the control feedback
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    @property
+    def budget(self) -> float:
+        """Seconds of work per tick"""
+        return self._budget
+
+    @budget.setter
+    def budget(self, budget: float) -> None:
+        self._budget = budget
+
+    @property
+    def overruns(self) -> int:
+        return self._overruns
+
+    @property
+    def tick_time(self) -> RollingStats:
+        return self._tick_time
+
+    def add(self, name: str, callback: Callable[[], None], rate: float, priority: Priority = Priority.NORMAL) -> None:
+        """Runs `callback` `rate` times a second, replaces a task of the same name"""
+        self._tasks[name] = _Task(name, callback, rate, priority)
+        self._order = sorted(self._tasks.values(), key=lambda task: task.priority)
+        self._arm()
+
+    def remove(self, name: str) -> None:
+        self._tasks.pop(name, None)
+        self._order = sorted(self._tasks.values(), key=lambda task: task.priority)
+
+    def set_rate(self, name: str, rate: float) -> None:
+        self._tasks[name].schedule.rate = rate
+        self._arm()
+
+    def start(self) -> None:
+        self._running = True
+        self._arm()
+
+    def stop(self) -> None:
+        self._running = False
+        self._timer.stop()
+
+    def _arm(self) -> None:
+        """Sets the timer for the earliest deadline, right away (after pending events) for deferred tasks"""
+        if not self._running or not self._order:
+            return
+        now = time.monotonic()
+        wait = min(task.schedule.time_until_next(now) for task in self._order)
+        self._timer.start(max(0, math.ceil(wait * 1000)))
+
+    def _tick(self) -> None:
+        try:
+            self._run_due()
+        finally:
+            self._arm()
+
+    def _run_due(self) -> None:
+        start = perf_counter()
+        now = time.monotonic()
+        slowest, slowest_time = None, 0.0
+        for task in self._order:
+            if not task.schedule.due(now):
+                continue
+            if task.priority == Priority.LOW and perf_counter() - start >= self._budget:
+                task.deferred += 1
+                continue
+            task.schedule.tick(now)
+            task_start = perf_counter()
+            task.callback()
+            elapsed = perf_counter() - task_start
+            task.run_time.add(elapsed)
+            if elapsed > slowest_time:
+                slowest, slowest_time = task.name, elapsed
+        total = perf_counter() - start
+        if slowest is None:
+            return
+        self._tick_time.add(total)
+        if total > self._budget:
+            self._overruns += 1
+            self.overrun.emit(slowest, total)
+
+    def summary(self) -> str:
+        _, _, p99 = self._tick_time.percentiles()
+        deferred = sum(task.deferred for task in self._tasks.values())
+        return f"UI tick p99 {p99 * 1e3:.1f}/{self._budget * 1e3:.0f} ms  overruns {self._overruns}  deferred {deferred}"
+
+    def report(self) -> list[str]:
+        """One line per task: rate, run time percentiles, lateness and deferrals"""
+        lines = []
+        for task in self._order:
+            p50, _, p99 = task.run_time.percentiles()
+            _, _, late99 = task.schedule.lateness.percentiles()
+            lines.append(f"{task.name:<12} {task.priority.name:<6} {task.schedule.rate:5.1f} Hz  "
+                         f"run {p50 * 1e3:.2f}/{p99 * 1e3:.2f} ms  late p99 {late99 * 1e3:.1f} ms  "
+                         f"deferred {task.deferred}")
+        return lines
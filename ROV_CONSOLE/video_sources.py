@@ -0,0 +1,127 @@
+"""
+    Picks the capture backend for a camera descriptor.
+    Device indices and files go through cv2.VideoCapture, HTTP(S) URLs are read as MJPEG streams.
+    Files are paced to their frame timestamps, they would otherwise be read as fast as they decode.
+    Camera specs from the configuration are resolved here as well, see resolve_source().
+"""
+
+import os
+from time import perf_counter, sleep
+
+import cv2
+import numpy as np
+
+from .constants import RASPBERRY_PI_IP
+from .mjpeg import MjpegCapture
+
+# Upper bound for opening a source and for a single read, keeps a dead tether from hanging a capture thread
+OPEN_TIMEOUT = 5.0
+# Frame rate assumed for files that don't report one
+_FALLBACK_FPS = 30.0
+# A file this far behind its timestamps (slow decoding) plays on from where it is instead of catching up
+_MAX_LAG = 0.5
+
+
+def is_mjpeg_url(descriptor: int | str | None) -> bool:
+    return isinstance(descriptor, str) and descriptor.startswith(("http://", "https://"))
+
+
+def resolve_source(spec: int | str | None) -> int | str | None:
+    """
+    Turns a camera spec into a capture descriptor:
+       - "" / "none" -> no camera
+       - "2" -> device index 2
+       - "pi:8081" -> ustreamer feed on the Pi at port 8081
+       - anything else (file path, URL) is used as is
+    """
+    if spec is None or isinstance(spec, int):
+        return spec
+    spec = spec.strip()
+    if not spec or spec.lower() == "none":
+        return None
+    if spec.isdigit():
+        return int(spec)
+    if spec.startswith("pi:"):
+        return f"http://{RASPBERRY_PI_IP}:{spec[3:]}/stream"
+    return spec
+
+
+def open_capture(descriptor: int | str | None, timeout: float = OPEN_TIMEOUT):
+    """Returns a cv2.VideoCapture-like source for `descriptor`, spends at most about `timeout` opening it"""
+    if is_mjpeg_url(descriptor):
+        return MjpegCapture(descriptor, timeout=timeout)
+    source = cv2.VideoCapture()
+    if descriptor is not None:
+        timeout_ms = int(timeout * 1000)
+        # Honoured by the network/ file backends (FFMPEG, GStreamer), device backends ignore them
+        source.open(descriptor, cv2.CAP_ANY,
+                    [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms])
+    if isinstance(descriptor, str) and os.path.isfile(descriptor):
+        return PacedCapture(source)
+    return source
+
+
+class PacedCapture:
+    """
+    cv2.VideoCapture wrapper for files: grab() returns no earlier than the grabbed frame is due, by its
+    timestamp (CAP_PROP_POS_MSEC) or, where the backend has none, by CAP_PROP_FPS
+    """
+
+    def __init__(self, capture: cv2.VideoCapture):
+        self._capture = capture
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        self._period = 1 / (fps if 0 < fps < 1000 else _FALLBACK_FPS)
+        self._start: float | None = None
+        self._position = -self._period
+
+    def isOpened(self) -> bool:
+        return self._capture.isOpened()
+
+    def get(self, prop_id: int) -> float:
+        return self._capture.get(prop_id)
+
+    def grab(self) -> bool:
+        if not self._capture.grab():
+            return False
+        position = self._capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if position <= self._position:
+            position = self._position + self._period
+        self._position = position
+        now = perf_counter()
+        if self._start is None or now - (self._start + position) > _MAX_LAG:
+            self._start = now - position
+        wait = self._start + position - now
+        if wait > 0:
+            sleep(wait)
+        return True
+
+    def retrieve(self) -> tuple[bool, np.ndarray | None]:
+        return self._capture.retrieve()
+
+    def read(self) -> tuple[bool, np.ndarray | None]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self) -> None:
+        self._capture.release()
+
+
+def timed_read(source) -> tuple[bool, np.ndarray | None, float, float]:
+    """
+    read() that also returns the perf_counter() time the encoded frame arrived and the seconds spent decoding it.
+    Sources that decode on their own threads report both through `frame_timing`, cv2.VideoCapture is split into
+    grab() (waits for the frame) and retrieve() (decodes it). Backends that decode inside grab(), like FFmpeg,
+    still count their decoding as arrival
+    """
+    if hasattr(source, "frame_timing"):
+        ok, frame = source.read()
+        if not ok:
+            return False, None, perf_counter(), 0.0
+        arrived, decode = source.frame_timing
+        return True, frame, arrived, decode
+    if not source.grab():
+        return False, None, perf_counter(), 0.0
+    arrived = perf_counter()
+    ok, frame = source.retrieve()
+    return ok, frame, arrived, perf_counter() - arrived
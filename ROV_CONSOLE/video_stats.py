@@ -0,0 +1,45 @@
+"""
+    Per-stage latency and frame rate bookkeeping for the VideoStream -> CameraWidget path.
+    Samples are kept in fixed-size rolling windows (see stats.py), percentiles are computed on demand.
+"""
+
+import csv
+
+from .stats import RollingStats, RateMeter
+
+
+class VideoStats:
+    """Latency per pipeline stage (seconds) and capture/ display frame rates of one camera"""
+
+    # wait: capture thread idle until the next encoded frame arrived, decode: decoding it (on whichever
+    # thread or process the source decodes), convert: scale/ flip/ colour conversion,
+    # queue: published -> picked up by the GUI thread, paint: pixmap upload,
+    # total: encoded frame arrived -> on screen
+    STAGES = ("wait", "decode", "convert", "queue", "paint", "total")
+
+    def __init__(self, window: int = 300):
+        self.stages = {stage: RollingStats(window) for stage in self.STAGES}
+        self.capture_rate = RateMeter()
+        self.display_rate = RateMeter()
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage].add(seconds)
+
+    def summary(self) -> str:
+        lines = [f"capture {self.capture_rate.rate:5.1f} fps   display {self.display_rate.rate:5.1f} fps",
+                 "stage      p50    p95    p99 (ms)"]
+        for stage, stats in self.stages.items():
+            p50, p95, p99 = stats.percentiles()
+            lines.append(f"{stage:<8}{p50 * 1e3:6.1f} {p95 * 1e3:6.1f} {p99 * 1e3:6.1f}")
+        return "\n".join(lines)
+
+    def export_csv(self, file_path: str) -> None:
+        with open(file_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["stage", "samples", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+            for stage, stats in self.stages.items():
+                p50, p95, p99 = stats.percentiles()
+                writer.writerow([stage, stats.count] + [f"{v * 1e3:.3f}" for v in (stats.mean(), p50, p95, p99)])
+            writer.writerow([])
+            writer.writerow(["capture_fps", f"{self.capture_rate.rate:.2f}"])
+            writer.writerow(["display_fps", f"{self.display_rate.rate:.2f}"])
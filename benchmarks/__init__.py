@@ -0,0 +1,16 @@
+"""
+    Headless benchmarks for the console's hot paths, results are written as JSON so runs can be compared.
+    Run from the repository root: python -m benchmarks [-o results.json] [benchmark ...]
+
+    Importing this package configures Qt and SDL for running without a display or gamepad,
+    it has to happen before PySide6/ pygame are imported.
+"""
+
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+# No real cameras, benchmarks that need video bring synthetic sources
+os.environ.setdefault("ROV_CAMERA_SOURCES", "none,none,none")
@@ -0,0 +1,63 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import benchmarks  # noqa: F401  (headless environment before anything imports Qt or pygame)
+
+from . import bench_control, bench_gui, bench_mjpeg, bench_telemetry, bench_video, input_latency
+
+BENCHMARKS = {
+    "video": bench_video.run,
+    "mjpeg": bench_mjpeg.run,
+    "control": bench_control.run,
+    "telemetry": bench_telemetry.run,
+    "gui": bench_gui.run,
+    "latency": input_latency.run,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the ROV console")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)}, all by default")
+    parser.add_argument("-o", "--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("-d", "--duration", type=float, default=3.0, help="seconds per timed run")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "duration_s": args.duration,
+            },
+        "results": {},
+        }
+    for name in args.names or BENCHMARKS:
+        print(f"running {name}...", file=sys.stderr, flush=True)
+        results["results"][name] = BENCHMARKS[name](args.duration)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Controller packet rate and cadence with a scripted gamepad, plus the cost of encoding and mixing"""
+
+import math
+import threading
+import time
+from time import perf_counter
+
+from ROV_CONSOLE.constants import CONTROL_RATE
+
+from .common import describe, time_calls
+from .fakes import VirtualGamepad, attach_gamepad
+
+RATE = CONTROL_RATE
+INPUT_RATE = 500.0
+
+
+def run(duration: float) -> dict:
+    from ROV_CONSOLE.gamepad import Controller
+
+    packets = []
+    controller = Controller(payload_callback=lambda payload, kind: packets.append(perf_counter()), rate=RATE)
+    gamepad = VirtualGamepad()
+    attach_gamepad(controller, gamepad)
+
+    stop = threading.Event()
+    moves = 0
+
+    def drive():
+        nonlocal moves
+        start = time.monotonic()
+        while not stop.is_set():
+            # Sweeps both sticks, every event changes the payload
+            t = time.monotonic() - start
+            gamepad.move(0, math.sin(t * 2.0))
+            gamepad.move(3, math.cos(t * 1.3))
+            moves += 2
+            time.sleep(1 / INPUT_RATE)
+
+    driver = threading.Thread(target=drive, daemon=True)
+    time.sleep(0.2)
+    packets.clear()
+    driver.start()
+    time.sleep(duration)
+    stop.set()
+    driver.join()
+    sent = len(packets)
+    intervals = [b - a for a, b in zip(packets, packets[1:])]
+
+    state = dict(controller.bindings_state) or {
+        "LS-H": 0.5, "LS-V": -0.25, "RS-H": 0.1, "RS-V": 0.0, "L2": 0.0, "R2": 0.75,
+        }
+    axes = controller._input_axes(state)
+    result = {
+        "cadence_hz": RATE,
+        "input_events_per_s": moves / duration,
+        "packets_per_s": sent / duration,
+        "packet_interval_ms": describe(intervals),
+        "scheduler_lateness_ms": describe(controller.scheduler.lateness.values().tolist()),
+        "scheduler_missed": controller.scheduler.missed,
+        "encode_us": time_calls(lambda: controller._encode_payload(state, 0), 20000) * 1e6,
+        "mix_us": time_calls(lambda: controller.mixer.mix(axes), 20000) * 1e6,
+        "mix_encode_us": time_calls(lambda: controller.mixer.encode(controller.mixer.mix(axes), 0), 20000) * 1e6,
+        }
+    controller.kill()
+    return result
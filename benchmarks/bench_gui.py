@@ -0,0 +1,45 @@
+"""MainWindow cold start (fresh interpreter) and the cost of rebuilding the menu bar"""
+
+import json
+import os
+import subprocess
+import sys
+from time import perf_counter
+
+from .common import describe, qt_app, run_event_loop
+
+COLD_STARTS = 3
+MENU_REBUILDS = 200
+
+
+def _menu_bar() -> dict:
+    from ROV_CONSOLE.gui import MainWindow
+
+    qt_app()
+    window = MainWindow()
+    run_event_loop(0.5)
+    samples = []
+    for _ in range(MENU_REBUILDS):
+        start = perf_counter()
+        window.createMenuBar()
+        samples.append(perf_counter() - start)
+    window.close()
+    window.device_watcher.kill()
+    return describe(samples)
+
+
+def _cold_start() -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    for _ in range(COLD_STARTS):
+        start = perf_counter()
+        output = subprocess.run([sys.executable, "-m", "benchmarks.cold_start"], cwd=root, env=os.environ,
+                                capture_output=True, text=True, check=True).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        run["process_s"] = perf_counter() - start
+        runs.append(run)
+    return {key: describe([run[key] for run in runs], scale=1.0) for key in runs[0]}
+
+
+def run(duration: float) -> dict:
+    return {"create_menu_bar_ms": _menu_bar(), "cold_start_s": _cold_start()}
@@ -0,0 +1,76 @@
+"""
+    MjpegCapture against a local MJPEG server: delivered frame rate, decode time and arrival-to-read latency with
+    and without Content-Length, the reduced-scale decode for small displays, and VideoStream reconnecting to a
+    server that drops the connection
+"""
+
+import time
+from time import perf_counter
+
+from .common import describe
+from .fakes import MjpegServer
+
+SIZE = (1280, 720)
+FPS = 30.0
+
+
+def _read_for(capture, duration: float) -> dict:
+    decode, latency, shapes = [], [], set()
+    end = perf_counter() + duration
+    while perf_counter() < end:
+        ok, frame = capture.read()
+        if not ok:
+            continue
+        arrived, decode_time = capture.frame_timing
+        decode.append(decode_time)
+        latency.append(perf_counter() - arrived)
+        shapes.add(frame.shape[1::-1])
+    return {
+        "fps": len(decode) / duration,
+        "decode_ms": describe(decode),
+        "arrival_to_read_ms": describe(latency),
+        "frame_sizes": sorted(shapes),
+        }
+
+
+def _measure(duration: float, content_length: bool, target_size: tuple[int, int] | None = None) -> dict:
+    from ROV_CONSOLE.mjpeg import MjpegCapture
+
+    server = MjpegServer(*SIZE, fps=FPS, content_length=content_length)
+    capture = MjpegCapture(server.url)
+    capture.target_size = target_size
+    result = {"opened": capture.isOpened()}
+    result.update(_read_for(capture, duration))
+    release_start = perf_counter()
+    capture.release()
+    result["release_ms"] = (perf_counter() - release_start) * 1e3
+    server.close()
+    return result
+
+
+def _reconnect(duration: float) -> dict:
+    from ROV_CONSOLE.cv_stream import VideoStream
+
+    # Drops the connection every second, VideoStream has to notice and reopen each time
+    server = MjpegServer(*SIZE, fps=FPS, frames_per_connection=int(FPS))
+    stream = VideoStream(server.url, isolated=False)
+    seqs = 0
+    last_seq = 0
+    end = perf_counter() + max(duration, 3.0)
+    while perf_counter() < end:
+        if stream.wait_frame(last_seq, 0.1):
+            last_seq = stream.seq
+            seqs += 1
+    stream.kill()
+    server.close()
+    time.sleep(0.1)
+    return {"connections": server.connections, "reconnects": stream.reconnects, "frames": seqs}
+
+
+def run(duration: float) -> dict:
+    return {
+        "content_length": _measure(duration, content_length=True),
+        "boundary_scan": _measure(duration, content_length=False),
+        "reduced_decode": _measure(duration, content_length=True, target_size=(SIZE[0] // 4, SIZE[1] // 4)),
+        "reconnect": _reconnect(duration),
+        }
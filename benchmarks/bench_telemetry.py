@@ -0,0 +1,68 @@
+"""Telemetry decode throughput in memory, and end to end from the simulator over a pty"""
+
+import sys
+import threading
+import time
+from time import perf_counter
+
+from ROV_CONSOLE.protocol import FrameDecoder, FrameEncoder, MessageType
+from ROV_CONSOLE.telemetry import PAYLOAD, Telemetry
+
+FRAMES = 50000
+CHUNK = 4096
+PTY_RATE = 2000.0
+
+
+def _parse(frames: int) -> dict:
+    encoder = FrameEncoder()
+    wire = encoder.encode_many([(MessageType.TELEMETRY, PAYLOAD.pack(1.5, 90.0, -3.0, 0.5))] * frames)
+    chunks = [wire[i:i + CHUNK] for i in range(0, len(wire), CHUNK)]
+    decoder = FrameDecoder()
+    telemetry = Telemetry()
+    start = perf_counter()
+    for chunk in chunks:
+        for frame in decoder.feed(chunk):
+            telemetry.on_frame(frame)
+    elapsed = perf_counter() - start
+    return {
+        "frames": telemetry.received,
+        "frames_per_s": telemetry.received / elapsed,
+        "mb_per_s": len(wire) / elapsed / 1e6,
+        "errors": decoder.errors,
+        }
+
+
+def _pty(duration: float) -> dict:
+    from ROV_CONSOLE.esp32 import ESP32
+    from ROV_CONSOLE.simulator import PtyTransport, Simulator
+
+    transport = PtyTransport()
+    simulator = Simulator(transport, rate=PTY_RATE)
+    thread = threading.Thread(target=simulator.run, daemon=True)
+    thread.start()
+    esp = ESP32()
+    esp.connect(transport.name)
+    time.sleep(0.5)
+    received = esp.telemetry.received
+    start = perf_counter()
+    time.sleep(duration)
+    elapsed = perf_counter() - start
+    result = {
+        "sent_rate_hz": PTY_RATE,
+        "received_per_s": (esp.telemetry.received - received) / elapsed,
+        "decoder_errors": esp.decoder.errors,
+        "decoder_lost": esp.decoder.lost,
+        "state": str(esp.state),
+        }
+    esp.kill()
+    simulator.kill()
+    thread.join()
+    transport.close()
+    return result
+
+
+def run(duration: float) -> dict:
+    result = {"parse": _parse(FRAMES)}
+    if sys.platform != "win32":
+        result["pty"] = _pty(duration)
+    return result
@@ -0,0 +1,49 @@
+"""CameraWidget render rate and GUI-thread time per frame, fed by synthetic sources of several resolutions"""
+
+from time import perf_counter
+
+from .common import describe, qt_app, run_event_loop
+from .fakes import install_synthetic_sources, synthetic_descriptor
+
+RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080))
+SOURCE_FPS = 60.0
+WIDGET_SIZE = (640, 360)
+
+
+def _measure(width: int, height: int, duration: float) -> dict:
+    from ROV_CONSOLE.gui import CameraWidget
+
+    widget = CameraWidget(None, synthetic_descriptor(width, height, SOURCE_FPS))
+    widget.resize(*WIDGET_SIZE)
+    widget.show()
+    tick_times = []
+    update = widget.update
+
+    def timed_update():
+        start = perf_counter()
+        update()
+        tick_times.append(perf_counter() - start)
+
+    widget.update = timed_update
+    # Warm-up: the stream opens and renders at the widget size before measuring
+    run_event_loop(0.5)
+    tick_times.clear()
+    start = perf_counter()
+    run_event_loop(duration)
+    elapsed = perf_counter() - start
+    stream = widget._stream
+    stages = {stage: describe(stats.values().tolist()) for stage, stats in stream.stats.stages.items()}
+    widget.close()
+    stream.kill()
+    return {
+        "source_fps": SOURCE_FPS,
+        "render_fps": len(tick_times) / elapsed,
+        "gui_ms_per_frame": describe(tick_times),
+        "stages_ms": stages,
+        }
+
+
+def run(duration: float) -> dict:
+    qt_app()
+    install_synthetic_sources()
+    return {f"{width}x{height}": _measure(width, height, duration) for width, height in RESOLUTIONS}
@@ -0,0 +1,25 @@
+"""Run in a fresh interpreter by bench_gui: times importing the GUI, building MainWindow and its first paint"""
+
+from time import perf_counter
+
+start = perf_counter()
+
+import json  # noqa: E402
+
+import benchmarks  # noqa: E402,F401  (headless environment)
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from ROV_CONSOLE.gui import MainWindow  # noqa: E402
+
+imported = perf_counter()
+app = QApplication([])
+window = MainWindow()
+constructed = perf_counter()
+app.processEvents()
+shown = perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "construct_s": constructed - imported,
+    "first_events_s": shown - constructed,
+    "total_s": shown - start,
+    }))
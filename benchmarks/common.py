@@ -0,0 +1,43 @@
+"""Helpers shared by the benchmarks: summarising samples, running the Qt event loop for a while"""
+
+import statistics
+from time import perf_counter
+
+
+def describe(samples: list[float], scale: float = 1e3) -> dict[str, float]:
+    """Mean and percentiles of `samples` (seconds), by default in milliseconds"""
+    if not samples:
+        return {"count": 0}
+    if len(samples) == 1:
+        p50 = p95 = p99 = samples[0]
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    return {
+        "count": len(samples),
+        "mean": statistics.fmean(samples) * scale,
+        "p50": p50 * scale,
+        "p95": p95 * scale,
+        "p99": p99 * scale,
+        "max": max(samples) * scale,
+        }
+
+
+def time_calls(function, repeat: int) -> float:
+    """Seconds per call of `function()`"""
+    start = perf_counter()
+    for _ in range(repeat):
+        function()
+    return (perf_counter() - start) / repeat
+
+
+def qt_app():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def run_event_loop(seconds: float) -> None:
+    from PySide6.QtCore import QTimer
+    app = qt_app()
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec()
@@ -0,0 +1,193 @@
+"""
+    Stand-ins for hardware: a synthetic camera for VideoStream, a local MJPEG server in place of ustreamer
+    and a scripted gamepad for Controller. All go through the same code paths as the real devices, only the
+    device itself is replaced.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pygame
+
+from ROV_CONSOLE.cv_stream import VideoStream
+from ROV_CONSOLE.gamepad import BindingNames, GamepadTypes
+
+SYNTHETIC_PREFIX = "synthetic:"
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture look-alike delivering pregenerated BGR frames at `fps`"""
+
+    def __init__(self, width: int, height: int, fps: float = 60.0, variants: int = 8):
+        rng = np.random.default_rng(0)
+        self._frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(variants)]
+        self._period = 1 / fps
+        self._next = time.monotonic()
+        self._index = 0
+        self._arrived = 0.0
+        self._opened = True
+
+    @property
+    def frame_timing(self) -> tuple[float, float]:
+        """Frames are pregenerated, they arrive when due and take no time to decode"""
+        return self._arrived, 0.0
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def read(self):
+        wait = self._next - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._arrived = time.perf_counter()
+        self._next = max(self._next + self._period, time.monotonic())
+        self._index = (self._index + 1) % len(self._frames)
+        return True, self._frames[self._index]
+
+    def release(self) -> None:
+        self._opened = False
+
+
+def synthetic_descriptor(width: int, height: int, fps: float = 60.0) -> str:
+    return f"{SYNTHETIC_PREFIX}{width}x{height}@{fps:g}"
+
+
+def install_synthetic_sources() -> None:
+    """Makes VideoStream open descriptors from synthetic_descriptor() as SyntheticCapture"""
+    open_source = VideoStream._open_source
+
+    def _open_source(descriptor, isolated):
+        if isinstance(descriptor, str) and descriptor.startswith(SYNTHETIC_PREFIX):
+            size, _, fps = descriptor[len(SYNTHETIC_PREFIX):].partition("@")
+            width, height = (int(v) for v in size.split("x"))
+            return SyntheticCapture(width, height, float(fps or 60))
+        return open_source(descriptor, isolated)
+
+    VideoStream._open_source = staticmethod(_open_source)
+
+
+class MjpegServer:
+    """
+    Serves canned JPEGs as multipart/x-mixed-replace on localhost, like ustreamer's /stream.
+    `content_length`: send a Content-Length per part, without it the client has to scan for the boundary.
+    `frames_per_connection`: close each connection after that many frames, the client has to reconnect
+    """
+
+    BOUNDARY = "frameboundary"
+
+    def __init__(self, width: int, height: int, fps: float = 30.0, content_length: bool = True,
+                 frames_per_connection: int | None = None, variants: int = 8):
+        rng = np.random.default_rng(0)
+        # Smooth gradients with noise compress like camera images, pure noise would make unrealistically large JPEGs
+        ramp = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None]
+        self._jpegs = []
+        for _ in range(variants):
+            frame = np.broadcast_to(ramp, (height, width, 3)).copy()
+            frame += rng.integers(0, 32, frame.shape, dtype=np.uint8)
+            self._jpegs.append(cv2.imencode(".jpg", frame)[1].tobytes())
+        self._period = 1 / fps
+        self._content_length = content_length
+        self._frames_per_connection = frames_per_connection
+        self._stopped = threading.Event()
+        self.connections = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/stream"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                server.connections += 1
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={server.BOUNDARY}")
+                self.end_headers()
+                sent = 0
+                next_frame = time.monotonic()
+                try:
+                    while not server._stopped.is_set():
+                        if server._frames_per_connection is not None and sent >= server._frames_per_connection:
+                            return
+                        jpeg = server._jpegs[sent % len(server._jpegs)]
+                        head = f"--{server.BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                        if server._content_length:
+                            head += f"Content-Length: {len(jpeg)}\r\n"
+                        self.wfile.write(head.encode() + b"\r\n" + jpeg + b"\r\n")
+                        self.wfile.flush()
+                        sent += 1
+                        next_frame += server._period
+                        server._stopped.wait(max(0.0, next_frame - time.monotonic()))
+                except OSError:
+                    # The client went away
+                    pass
+
+        return Handler
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class VirtualGamepad:
+    """
+    Quacks like a pygame Joystick of a DS4. Input is scripted through move()/ press(), which update the
+    device state and post the matching events to pygame's queue, as SDL does for a real device
+    """
+
+    def __init__(self, instance_id: int = 1000):
+        names = BindingNames.DS4
+        self._instance_id = instance_id
+        self._buttons = [0] * len(names["buttons"])
+        # Triggers rest at -1 like on the real device
+        self._axes = [0.0] * len(names["axes"]) + [-1.0] * len(names["triggers"])
+
+    def get_instance_id(self) -> int:
+        return self._instance_id
+
+    def get_id(self) -> int:
+        return 0
+
+    def get_guid(self) -> str:
+        return "virtual-ds4"
+
+    def get_name(self) -> str:
+        return GamepadTypes.DS4.value
+
+    def get_button(self, i: int) -> int:
+        return self._buttons[i]
+
+    def get_axis(self, i: int) -> float:
+        return self._axes[i]
+
+    def move(self, axis: int, value: float) -> None:
+        self._axes[axis] = value
+        pygame.event.post(pygame.event.Event(pygame.JOYAXISMOTION, instance_id=self._instance_id,
+                                             axis=axis, value=value))
+
+    def press(self, button: int, down: bool = True) -> None:
+        self._buttons[button] = int(down)
+        kind = pygame.JOYBUTTONDOWN if down else pygame.JOYBUTTONUP
+        pygame.event.post(pygame.event.Event(kind, instance_id=self._instance_id, button=button))
+
+
+def attach_gamepad(controller, gamepad: VirtualGamepad) -> None:
+    """Selects `gamepad` on `controller` as if SDL had enumerated it"""
+    controller._gamepads = [gamepad]
+    controller._gamepad_names = [f"{gamepad.get_id()}: {gamepad.get_name()}"]
+    controller._gamepad_guid = gamepad.get_guid()
+    controller._type = GamepadTypes.DS4.name
+    controller._gamepad = gamepad
@@ -0,0 +1,195 @@
+"""
+    Input-to-wire latency of the control path: a scripted gamepad drives Controller, the packets go
+    through ESP32 onto a pty, and the far end of the pty timestamps each packet as it arrives.
+
+    Trace rows sharing a timestamp are posted together and form one input change, the way SDL reports several
+    axes moving at once. Every change is matched to the first packet carrying the payload of the state after
+    the whole batch; changes whose payload never shows up were superseded before reaching the wire and count
+    as dropped. The controller folding a batch's events into one packet is not a drop.
+
+    python -m benchmarks.input_latency [--trace trace.csv] [--legacy] [-o result.json]
+    python -m benchmarks.input_latency --record trace.csv [--duration 30]  (from a real gamepad)
+
+    Traces are CSV rows of: seconds since start, axis index, value
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import sys
+import threading
+import time
+from time import perf_counter
+
+import benchmarks  # noqa: F401  (headless environment)
+
+from ROV_CONSOLE.constants import CONTROL_RATE
+
+from .common import describe
+from .fakes import VirtualGamepad, attach_gamepad
+
+TRACE_RATE = 250.0
+
+
+def synthetic_trace(duration: float, rate: float = TRACE_RATE) -> list[tuple[float, int, float]]:
+    """Both sticks sweeping at different frequencies, like a pilot steering continuously"""
+    trace = []
+    for i in range(int(duration * rate)):
+        t = i / rate
+        trace.append((t, 0, 0.8 * math.sin(t * 1.7)))
+        trace.append((t, 1, 0.9 * math.sin(t * 0.9 + 1.0)))
+        trace.append((t, 3, 0.7 * math.cos(t * 2.3)))
+    return trace
+
+
+def load_trace(file_path: str) -> list[tuple[float, int, float]]:
+    with open(file_path, newline="") as file:
+        return [(float(t), int(axis), float(value)) for t, axis, value in csv.reader(file)]
+
+
+def record_trace(file_path: str, duration: float) -> None:
+    """Records the stick motion of the first real gamepad"""
+    import pygame
+    pygame.init()
+    if pygame.joystick.get_count() == 0:
+        raise SystemExit("No gamepad connected")
+    gamepad = pygame.joystick.Joystick(0)
+    start = time.monotonic()
+    with open(file_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        while (now := time.monotonic() - start) < duration:
+            for event in pygame.event.get(pygame.JOYAXISMOTION):
+                if event.instance_id == gamepad.get_instance_id():
+                    writer.writerow([f"{now:.6f}", event.axis, f"{event.value:.6f}"])
+            time.sleep(0.001)
+    pygame.quit()
+
+
+def measure(trace: list[tuple[float, int, float]], legacy: bool = False, rate: float = CONTROL_RATE) -> dict:
+    from ROV_CONSOLE.esp32 import ESP32
+    from ROV_CONSOLE.gamepad import Controller
+    from ROV_CONSOLE.protocol import FrameDecoder, MessageType
+    from ROV_CONSOLE.simulator import LegacyDecoder, PtyTransport
+
+    transport = PtyTransport()
+    esp = ESP32(legacy_control_packets=legacy)
+    esp.connect(transport.name)
+    controller = Controller(rate=rate, client_mixing=False)
+    gamepad = VirtualGamepad()
+    attach_gamepad(controller, gamepad)
+    controller.payload_callback = esp.send
+
+    # Far end of the pty: every control payload with the time it arrived
+    arrivals: list[tuple[float, bytes]] = []
+    stop = threading.Event()
+
+    def read_wire():
+        decoder = LegacyDecoder() if legacy else FrameDecoder()
+        while not stop.is_set():
+            data = transport.read(0.05)
+            if not data:
+                continue
+            arrived = perf_counter()
+            if legacy:
+                arrivals.extend((arrived, payload) for payload in decoder.feed(data))
+            else:
+                arrivals.extend((arrived, frame.payload) for frame in decoder.feed(data)
+                                if frame.kind == MessageType.CONTROL)
+
+    reader = threading.Thread(target=read_wire, daemon=True)
+    reader.start()
+    time.sleep(0.5)
+
+    # What the controller should send after each input, tracked alongside it
+    state = controller._read_state()
+    last_payload = controller._encode_payload(state, 0)
+    changes: list[tuple[float, bytes]] = []
+    first_arrival = len(arrivals)
+    start = perf_counter()
+    for t, batch in itertools.groupby(trace, key=lambda row: row[0]):
+        delay = start + t - perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        posted = perf_counter()
+        for _, axis, value in batch:
+            state.update(controller._axis_state(axis, value))
+            gamepad.move(axis, value)
+        payload = controller._encode_payload(state, 0)
+        if payload != last_payload:
+            changes.append((posted, payload))
+            last_payload = payload
+    replay_end = perf_counter()
+    time.sleep(0.5)
+    stop.set()
+    reader.join()
+    controller.kill()
+    esp.kill()
+    transport.close()
+
+    wire = arrivals[first_arrival:]
+    latencies = []
+    dropped = 0
+    cursor = 0
+    for i, (posted, payload) in enumerate(changes):
+        following = changes[i + 1][1] if i + 1 < len(changes) else None
+        # Packets arrive in order, the search for the next change starts where this one matched
+        while cursor < len(wire) and wire[cursor][0] < posted:
+            cursor += 1
+        match = None
+        for j in range(cursor, len(wire)):
+            if wire[j][1] == payload:
+                match = j
+                break
+            if wire[j][1] == following:
+                # The next change made it out first, this one was coalesced away
+                break
+        if match is None:
+            dropped += 1
+            continue
+        latencies.append(wire[match][0] - posted)
+        cursor = match
+    packets = sum(1 for arrived, _ in wire if start <= arrived <= replay_end)
+    return {
+        "legacy": legacy,
+        "cadence_hz": rate,
+        "trace_events": len(trace),
+        "input_changes": len(changes),
+        "packets": packets,
+        "packets_per_input_change": packets / len(changes) if changes else 0.0,
+        "dropped_inputs": dropped,
+        "latency_ms": describe(latencies),
+        }
+
+
+def run(duration: float) -> dict:
+    if sys.platform == "win32":
+        return {"skipped": "needs a pty"}
+    return {mode: measure(synthetic_trace(duration), legacy=mode == "legacy") for mode in ("framed", "legacy")}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Input-to-wire latency of the control path")
+    parser.add_argument("--trace", help="CSV stick trace to replay, a synthetic sweep by default")
+    parser.add_argument("--record", help="record a trace from a real gamepad to this file instead")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of synthetic trace or recording")
+    parser.add_argument("--legacy", action="store_true", help="send bare 9-byte control packets")
+    parser.add_argument("--rate", type=float, default=CONTROL_RATE, help="controller cadence in Hz")
+    parser.add_argument("-o", "--output", help="write the JSON result to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.record:
+        record_trace(args.record, args.duration)
+        return
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(args.duration)
+    text = json.dumps(measure(trace, args.legacy, args.rate), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()